@@ -1,10 +1,12 @@
 from knowledge.data_ingestion import DexKitKnowledgeBase
+from knowledge.change_detection import get_digest_cache
+from knowledge.ingestion_manifest import get_manifest, PROCESSED, PROCESSING
 import json
 import shutil
 import os
+import sys
 from typing import Optional, List, Callable, Dict, Tuple
 from tqdm import tqdm
-from datetime import datetime
 import hashlib
 
 knowledge_base = DexKitKnowledgeBase(
@@ -12,10 +14,18 @@ knowledge_base = DexKitKnowledgeBase(
     chunk_overlap=50
 )
 
+TRAINING_HASHES_FILE = './knowledge_base/.training_hashes.json'
+
+class TrainingCancelled(Exception):
+    """Raised at a checkpoint when the running training job was cancelled"""
+
 def clean_previous_training():
-    """Clean previous training data but preserve docs and config"""
+    """
+    Forget previous training so the next run rebuilds everything, preserving docs and config.
+    The published knowledge base stays in place for readers until a full rebuild
+    (`python build_knowledge_base.py --full`) publishes a generation built from scratch.
+    """
     directories_to_clean = [
-        './knowledge_base',
         './__pycache__',
         './knowledge/__pycache__'
     ]
@@ -29,6 +39,10 @@ def clean_previous_training():
                 print(f"✓ Cleaned {directory}")
             except Exception as e:
                 print(f"! Error cleaning {directory}: {str(e)}")
+    
+    if os.path.exists(TRAINING_HASHES_FILE):
+        os.remove(TRAINING_HASHES_FILE)
+        print(f"✓ Cleaned {TRAINING_HASHES_FILE}")
 
 def load_youtube_urls():
     """Load YouTube URLs from config file"""
@@ -44,12 +58,8 @@ def load_youtube_urls():
         return []
 
 def calculate_file_hash(filepath: str) -> str:
-    """Calculate SHA-256 hash of a file"""
-    sha256_hash = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+    """Calculate SHA-256 hash of a file, reusing the cached digest if it is unchanged"""
+    return get_digest_cache().digest(filepath)
 
 def calculate_json_hash(json_data: dict) -> str:
     """Calculate hash of JSON data"""
@@ -58,7 +68,7 @@ def calculate_json_hash(json_data: dict) -> str:
 
 def load_training_hashes() -> Dict:
     """Load saved hashes from knowledge base"""
-    hash_file = './knowledge_base/.training_hashes.json'
+    hash_file = TRAINING_HASHES_FILE
     if os.path.exists(hash_file):
         with open(hash_file, 'r') as f:
             return json.load(f)
@@ -66,15 +76,16 @@ def load_training_hashes() -> Dict:
 
 def save_training_hashes(hashes: Dict):
     """Save current hashes to knowledge base"""
-    hash_file = './knowledge_base/.training_hashes.json'
+    hash_file = TRAINING_HASHES_FILE
     os.makedirs('./knowledge_base', exist_ok=True)
     with open(hash_file, 'w') as f:
         json.dump(hashes, f, indent=2)
 
-def check_critical_files_changed() -> Tuple[bool, List[str]]:
+def check_critical_files_changed() -> Tuple[bool, List[str], Dict]:
     """
     Check if any critical files have changed
-    Returns: (has_changes, changed_files)
+    Returns: (has_changes, changed_files, current_hashes); the hashes are saved by the caller
+    once a build including the changes has been published
     """
     critical_files = {
         'docs': './docs',
@@ -88,11 +99,9 @@ def check_critical_files_changed() -> Tuple[bool, List[str]]:
     changed_files = []
     
     if os.path.exists(critical_files['docs']):
-        pdf_hashes = {}
-        for filename in os.listdir(critical_files['docs']):
-            if filename.endswith('.pdf'):
-                filepath = os.path.join(critical_files['docs'], filename)
-                pdf_hashes[filename] = calculate_file_hash(filepath)
+        digest_cache = get_digest_cache()
+        pdf_hashes = digest_cache.digest_directory(critical_files['docs'])
+        digest_cache.save()
         current_hashes['docs'] = pdf_hashes
         
         if 'docs' not in previous_hashes or previous_hashes['docs'] != pdf_hashes:
@@ -128,35 +137,28 @@ def check_critical_files_changed() -> Tuple[bool, List[str]]:
         print("\n=== Changes detected in: ===")
         for file in changed_files:
             print(f"• {file}")
-        save_training_hashes(current_hashes)
     
-    return has_changes, changed_files
+    return has_changes, changed_files, current_hashes
 
 def get_file_hash(filepath: str) -> str:
-    """Get a unique hash of the file based on its content and modification date"""
-    return f"{os.path.getmtime(filepath)}_{os.path.getsize(filepath)}"
-
-def load_processed_files() -> Dict:
-    """Load the processed files registry"""
-    processed_files_path = './knowledge_base/.processed_files.json'
-    if os.path.exists(processed_files_path):
-        with open(processed_files_path, 'r') as f:
-            return json.load(f)
-    return {}
+    """Get a unique hash of the file based on its content"""
+    return calculate_file_hash(filepath)
 
-def save_processed_files(processed_files: Dict):
-    """Save the processed files registry"""
-    processed_files_path = './knowledge_base/.processed_files.json'
-    os.makedirs('./knowledge_base', exist_ok=True)
-    with open(processed_files_path, 'w') as f:
-        json.dump(processed_files, f, indent=2)
+def docs_changed_since_training(docs_dir: str = './docs') -> bool:
+    """Whether the PDFs differ from the ones recorded at the last training"""
+    digest_cache = get_digest_cache()
+    current = digest_cache.digest_directory(docs_dir)
+    digest_cache.save()
+    return current != load_training_hashes().get('docs', {})
 
-def check_for_updates() -> tuple[List[str], List[str]]:
+def check_for_updates(full_rebuild: bool = False) -> tuple[List[str], List[str]]:
     """
     Check for new files or changes
+    :param full_rebuild: Treat every PDF and video as new, for a generation that starts empty
     Returns: (new_pdfs, new_videos)
     """
-    processed_files = load_processed_files()
+    manifest = get_manifest()
+    processed_pdfs = {} if full_rebuild else manifest.hashes('pdf')
     new_pdfs = []
     new_videos = []
 
@@ -166,16 +168,18 @@ def check_for_updates() -> tuple[List[str], List[str]]:
                 filepath = os.path.join('./docs', filename)
                 file_hash = get_file_hash(filepath)
                 
-                if (filename not in processed_files.get('pdfs', {}) or 
-                    processed_files['pdfs'][filename]['hash'] != file_hash):
+                if processed_pdfs.get(filename) != file_hash:
                     new_pdfs.append(filepath)
                 else:
                     print(f"Skipping unchanged PDF: {filename}")
+        get_digest_cache().save()
 
-    if 'youtube_urls' in processed_files:
+    if full_rebuild:
+        new_videos = load_youtube_urls()
+    else:
         current_urls = set(load_youtube_urls())
-        processed_urls = set(processed_files['youtube_urls'])
-        new_videos = list(current_urls - processed_urls)
+        processed_urls = manifest.keys('youtube', status=PROCESSED)
+        new_videos = sorted(current_urls - processed_urls)
         if not new_videos:
             print("No new YouTube videos to process")
 
@@ -209,28 +213,47 @@ def update_knowledge_base(new_pdfs: Optional[List[str]] = None,
         print(f"Error in incremental update: {str(e)}")
         return False
 
-def main(callback=None):
+def main(callback=None, progress: Optional[Callable[[str, float], None]] = None,
+         should_cancel: Optional[Callable[[], bool]] = None, full_rebuild: bool = False):
+    """
+    Build or update the knowledge base in a new generation, published only if the build finishes
+    :param callback: Receives human-readable log messages
+    :param progress: Receives (stage, percent) as the build advances
+    :param should_cancel: Polled between steps; the build stops with TrainingCancelled when it returns True
+    :param full_rebuild: Start from an empty generation instead of a copy of the published one
+    """
+    def report(stage: str, percent: float):
+        if should_cancel and should_cancel():
+            raise TrainingCancelled(f"Training cancelled during {stage}")
+        if progress:
+            progress(stage, percent)
+
     print("\n=== Starting DexKit Knowledge Base Creation (GPT-3.5) ===\n")
     
     try:
-        has_changes, changed_files = check_critical_files_changed()
+        report('checking', 0)
+        has_changes, changed_files, current_hashes = check_critical_files_changed()
         
-        if not has_changes:
+        if not has_changes and not full_rebuild:
+            report('done', 100)
             return 0
-            
-        if not knowledge_base.db:
-            knowledge_base.create_knowledge_base()
         
-        new_pdfs, new_videos = check_for_updates()
+        generation = knowledge_base.begin_generation(copy_current=not full_rebuild)
+        print(f"Building knowledge base generation {generation}")
+        
+        report('web_docs', 5)
+        knowledge_base.create_knowledge_base()
+        
+        report('detecting_updates', 30)
+        new_pdfs, new_videos = check_for_updates(full_rebuild)
         
         if not new_pdfs and not new_videos:
             print("No changes detected.")
             print("✓ PDFs: No changes")
             print("✓ Videos: No changes")
-            return 0
-
-        print("\n=== Detected Updates ===")
+        
         if new_pdfs:
+            print("\n=== Detected Updates ===")
             print(f"• New or modified PDFs: {len(new_pdfs)}")
             for pdf in new_pdfs:
                 print(f"  - {os.path.basename(pdf)}")
@@ -242,40 +265,69 @@ def main(callback=None):
 
         if callback:
             callback("Starting update processing...")
+        
+        manifest = get_manifest()
+        processed, failed = [], []
 
         if new_pdfs:
             print("\n=== Processing PDFs ===")
-            for pdf_path in tqdm(new_pdfs, desc="Processing PDFs"):
+            report('pdfs', 35)
+            pdf_errors = {}
+            with tqdm(total=len(new_pdfs), desc="Parsing PDFs") as bar:
+                def parsed(done: int, total: int):
+                    bar.update(done - bar.n)
+                    # Parsing is most of the PDF work; embedding the chunks takes the rest
+                    report('pdfs', 35 + 35 * done / total)
+                
                 try:
-                    knowledge_base.process_new_pdfs([pdf_path])
-                    processed_files = load_processed_files()
-                    processed_files[os.path.basename(pdf_path)] = {
-                        'hash': get_file_hash(pdf_path),
-                        'last_processed': datetime.now().isoformat()
-                    }
-                    save_processed_files(processed_files)
+                    knowledge_base.process_new_pdfs(new_pdfs, errors=pdf_errors, progress=parsed)
+                except TrainingCancelled:
+                    raise
                 except Exception as e:
-                    print(f"Error processing {pdf_path}: {str(e)}")
+                    pdf_errors.update((pdf_path, str(e)) for pdf_path in new_pdfs if pdf_path not in pdf_errors)
+                    print(f"Error processing PDFs: {str(e)}")
+            for pdf_path in new_pdfs:
+                filename = os.path.basename(pdf_path)
+                if pdf_path in pdf_errors:
+                    failed.append(('pdf', filename, pdf_errors[pdf_path]))
+                    print(f"Error processing {pdf_path}: {pdf_errors[pdf_path]}")
+                else:
+                    processed.append(('pdf', filename, get_file_hash(pdf_path)))
 
         if new_videos:
+            report('videos', 85)
             print("\n=== Processing Videos ===")
-            for video_url in tqdm(new_videos, desc="Processing Videos"):
-                try:
-                    knowledge_base.process_new_videos([video_url])
-                    processed_files = load_processed_files()
-                    if 'youtube_urls' not in processed_files:
-                        processed_files['youtube_urls'] = []
-                    processed_files['youtube_urls'].append(video_url)
-                    save_processed_files(processed_files)
-                except Exception as e:
-                    print(f"Error processing {video_url}: {str(e)}")
+            try:
+                knowledge_base.process_new_videos(new_videos)
+                processed.extend(('youtube', video_url, None) for video_url in new_videos)
+            except Exception as e:
+                failed.extend(('youtube', video_url, str(e)) for video_url in new_videos)
+                print(f"Error processing videos: {str(e)}")
 
-        print("\n=== Knowledge base updated successfully! ===")
+        report('publishing', 95)
+        knowledge_base.publish_generation()
+        # Recorded only now, so the manifest never claims content readers cannot see yet
+        for kind, key, file_hash in processed:
+            manifest.mark_processed(kind, key, file_hash)
+        for kind, key, error in failed:
+            manifest.mark_failed(kind, key, error)
+        # Failed sources keep the recorded hashes stale, so the next run retries them
+        if not failed:
+            save_training_hashes(current_hashes)
+
+        report('done', 100)
+        print(f"\n=== Knowledge base generation {generation} published successfully! ===")
         if callback:
             callback("Knowledge base updated successfully!")
         
         return 0
         
+    except TrainingCancelled:
+        knowledge_base.abandon_generation()
+        print("\n! Training cancelled")
+        if callback:
+            callback("Training cancelled")
+        raise
     except Exception as e:
         error_msg = f"\n! Error in main process: {str(e)}"
         print(error_msg)
@@ -284,11 +336,73 @@ def main(callback=None):
         print("Stack trace:")
         import traceback
         traceback.print_exc()
+        if knowledge_base.building_generation:
+            knowledge_base.abandon_generation()
+        return 1
+
+def ingest_pdf(pdf_path: str, callback=None, progress: Optional[Callable[[str, float], None]] = None,
+               should_cancel: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Index a single PDF into a copy of the published generation and publish it, e.g. right after an upload
+    :param pdf_path: PDF to parse, embed and index
+    :param callback: Receives human-readable log messages
+    :param progress: Receives (stage, percent) as the ingestion advances
+    :param should_cancel: Polled before the PDF is parsed
+    """
+    filename = os.path.basename(pdf_path)
+    manifest = get_manifest()
+    if should_cancel and should_cancel():
+        raise TrainingCancelled(f"Ingestion of {filename} cancelled")
+    if not os.path.isfile(pdf_path):
+        # Deleted while the job was waiting
+        if callback:
+            callback(f"{filename} no longer exists, skipping")
+        return 0
+
+    try:
+        if progress:
+            progress('loading', 0)
+        file_hash = get_file_hash(pdf_path)
+        if manifest.hashes('pdf').get(filename) == file_hash:
+            if callback:
+                callback(f"{filename} is already indexed")
+            if progress:
+                progress('done', 100)
+            return 0
+
+        manifest.set_status('pdf', filename, PROCESSING)
+        knowledge_base.begin_generation(copy_current=True)
+        if progress:
+            progress('indexing', 10)
+        if callback:
+            callback(f"Indexing {filename}...")
+        errors = {}
+        documents = knowledge_base.process_new_pdfs([pdf_path], errors=errors)
+        if pdf_path in errors:
+            raise ValueError(errors[pdf_path])
+        if progress:
+            progress('publishing', 90)
+        knowledge_base.publish_generation()
+        manifest.mark_processed('pdf', filename, file_hash)
+
+        if progress:
+            progress('done', 100)
+        if callback:
+            callback(f"Indexed {filename}: {len(documents)} chunks")
+        return 0
+
+    except Exception as e:
+        if knowledge_base.building_generation:
+            knowledge_base.abandon_generation()
+        manifest.mark_failed('pdf', filename, str(e))
+        print(f"Error indexing {pdf_path}: {str(e)}")
+        if callback:
+            callback(f"Error indexing {filename}: {str(e)}")
         return 1
 
 if __name__ == "__main__":
     try:
-        exit_code = main()
+        exit_code = main(full_rebuild='--full' in sys.argv[1:])
         exit(exit_code)
     except Exception as e:
         print(f"\n! Critical Error: {str(e)}")
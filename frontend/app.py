@@ -1,22 +1,256 @@
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import os
 import sys
 import json
-from threading import Thread
+import time
+import hashlib
+import uuid
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
+from urllib.parse import unquote
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
   
-from build_knowledge_base import main as rebuild_kb
+from build_knowledge_base import main as rebuild_kb, ingest_pdf, docs_changed_since_training, TrainingCancelled
+from knowledge.change_detection import get_digest_cache
+from knowledge.ingestion_manifest import get_manifest, PROCESSED
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'docs')
+VIDEOS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'youtube_videos.json')
+KB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'knowledge_base')
+DOCUMENTS_PER_PAGE = 50
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+PDF_MAGIC = b'%PDF-'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-training_logs = []
+class LogBuffer:
+    def __init__(self, capacity: int = 1000):
+        """
+        Bounded buffer of training events, each numbered so clients can resume from a cursor
+        :param capacity: Events kept; older ones are dropped
+        """
+        self._events = deque(maxlen=capacity)
+        self._next_seq = 1
+        self._condition = threading.Condition()
+
+    def append(self, event_type: str, **data) -> Dict:
+        with self._condition:
+            event = {'seq': self._next_seq, 'type': event_type, 'time': datetime.now().isoformat(), **data}
+            self._next_seq += 1
+            self._events.append(event)
+            self._condition.notify_all()
+            return event
+
+    @property
+    def cursor(self) -> int:
+        """Sequence number of the last event"""
+        with self._condition:
+            return self._next_seq - 1
+
+    def since(self, seq: int) -> Tuple[List[Dict], bool]:
+        """Events after seq, and whether some of them were already dropped"""
+        with self._condition:
+            return self._since(seq)
+
+    def _clamp(self, seq: int) -> int:
+        # A cursor past the last event comes from before a restart; treat the client as caught up
+        return min(max(seq, 0), self._next_seq - 1)
+
+    def _since(self, seq: int) -> Tuple[List[Dict], bool]:
+        seq = self._clamp(seq)
+        if not self._events or seq >= self._events[-1]['seq']:
+            return [], False
+        first_seq = self._events[0]['seq']
+        truncated = seq < first_seq - 1
+        return list(self._events)[max(0, seq + 1 - first_seq):], truncated
+
+    def wait(self, seq: int, timeout: float) -> Tuple[List[Dict], bool]:
+        """Like since, but blocks up to timeout seconds for new events"""
+        with self._condition:
+            seq = self._clamp(seq)
+            self._condition.wait_for(lambda: self._next_seq - 1 > seq, timeout=timeout)
+            return self._since(seq)
+
+training_log = LogBuffer(int(os.getenv('TRAINING_LOG_BUFFER_SIZE', '1000')))
+SSE_KEEPALIVE_SECONDS = 15
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+@dataclass
+class TrainingJob:
+    id: str
+    kind: str = 'train'
+    target: Optional[str] = None
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stage: Optional[str] = None
+    progress: float = 0.0
+    stage_timings: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    requests: int = 1
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    _stage_started: Optional[float] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'target': self.target,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': round(self.progress, 1),
+            'stage_timings': {stage: round(seconds, 2) for stage, seconds in self.stage_timings.items()},
+            'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+            'finished_at': datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+            'requests': self.requests,
+            'cancel_requested': self.cancel_event.is_set(),
+            'error': self.error
+        }
+
+class TrainingScheduler:
+    def __init__(self, runners: Dict[str, Callable], history_size: int = 20,
+                 on_finish: Optional[Callable[[TrainingJob], None]] = None):
+        """
+        Runs training and ingestion jobs one at a time on a single worker thread
+        :param runners: Job kind to function taking [target,] callback, progress and should_cancel
+        :param history_size: Finished jobs kept for status queries
+        :param on_finish: Called after every job that ran, whatever its outcome
+        """
+        self._runners = runners
+        self._on_finish = on_finish
+        self._history_size = history_size
+        self._jobs: OrderedDict = OrderedDict()
+        self._pending: OrderedDict = OrderedDict()
+        self._current: Optional[TrainingJob] = None
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, kind: str = 'train', target: Optional[str] = None) -> Tuple[TrainingJob, bool]:
+        """Queues a job, or returns the same one already waiting; the flag tells if it is new"""
+        if kind not in self._runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with self._condition:
+            waiting = self._pending.get((kind, target))
+            if waiting:
+                # A waiting job will pick up every change made before it starts
+                waiting.requests += 1
+                return waiting, False
+            job = TrainingJob(id=uuid.uuid4().hex[:12], kind=kind, target=target)
+            self._pending[(kind, target)] = job
+            training_log.append('status', job_id=job.id, kind=kind, target=target, status=QUEUED)
+            self._jobs[job.id] = job
+            self._trim_history()
+            if not self._worker or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, name='training-worker', daemon=True)
+                self._worker.start()
+            self._condition.notify()
+            return job, True
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        """Drops a queued job or asks the running one to stop at its next checkpoint"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if not job or job.status not in (QUEUED, RUNNING):
+                return job
+            job.cancel_event.set()
+            if self._pending.get((job.kind, job.target)) is job:
+                del self._pending[(job.kind, job.target)]
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                training_log.append('status', job_id=job.id, status=CANCELLED)
+            return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def latest(self) -> Optional[TrainingJob]:
+        """The running job, else the next queued one, else the most recent finished one"""
+        with self._condition:
+            if self._current:
+                return self._current
+            if self._pending:
+                return next(iter(self._pending.values()))
+            return next(reversed(self._jobs.values()), None)
+
+    def is_busy(self) -> bool:
+        with self._condition:
+            return self._current is not None or bool(self._pending)
+
+    def _trim_history(self):
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self._history_size:
+                break
+            if self._jobs[job_id].status not in (QUEUED, RUNNING):
+                del self._jobs[job_id]
+
+    def _progress(self, job: TrainingJob, stage: str, percent: float):
+        now = time.perf_counter()
+        with self._condition:
+            if stage != job.stage:
+                if job.stage and job._stage_started is not None:
+                    job.stage_timings[job.stage] = job.stage_timings.get(job.stage, 0.0) + now - job._stage_started
+                job.stage = stage
+                job._stage_started = now
+            job.progress = max(job.progress, percent)
+        training_log.append('progress', job_id=job.id, stage=stage, progress=round(job.progress, 1))
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                _, job = self._pending.popitem(last=False)
+                self._current = job
+                job.status = RUNNING
+                job.started_at = time.time()
+            training_log.append('status', job_id=job.id, status=RUNNING)
+
+            try:
+                args = (job.target,) if job.target is not None else ()
+                exit_code = self._runners[job.kind](
+                    *args,
+                    lambda message: training_log.append('log', job_id=job.id, message=message),
+                    progress=lambda stage, percent: self._progress(job, stage, percent),
+                    should_cancel=job.cancel_event.is_set
+                )
+                status = COMPLETED if exit_code == 0 else FAILED
+                if status == FAILED:
+                    job.error = 'Job failed, see the training logs'
+            except TrainingCancelled:
+                status = CANCELLED
+            except Exception as e:
+                status = FAILED
+                job.error = str(e)
+
+            with self._condition:
+                if job.stage and job._stage_started is not None and job.stage != 'done':
+                    job.stage_timings[job.stage] = (job.stage_timings.get(job.stage, 0.0)
+                                                    + time.perf_counter() - job._stage_started)
+                job.status = status
+                job.finished_at = time.time()
+                self._current = None
+            if self._on_finish:
+                self._on_finish(job)
+            training_log.append('status', job_id=job.id, status=status, error=job.error,
+                                stage_timings=job.to_dict()['stage_timings'])
+
+training_scheduler = TrainingScheduler({'train': rebuild_kb, 'ingest_pdf': ingest_pdf}, on_finish=lambda job: stats_service.invalidate())
 
 def count_videos_recursive(data):
     """
@@ -68,13 +302,10 @@ def check_new_content(last_training_time):
     has_new_content = False
     
     docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'docs')
-    if os.path.exists(docs_dir):
-        for file in os.listdir(docs_dir):
-            if file.endswith('.pdf'):
-                file_path = os.path.join(docs_dir, file)
-                if datetime.fromtimestamp(os.path.getmtime(file_path)) > last_training_time:
-                    has_new_content = True
-                    break
+    try:
+        has_new_content = docs_changed_since_training(docs_dir)
+    except Exception as e:
+        print(f"Error checking documents for changes: {e}")
     
     videos_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'youtube_videos.json')
     if os.path.exists(videos_file) and datetime.fromtimestamp(os.path.getmtime(videos_file)) > last_training_time:
@@ -82,57 +313,165 @@ def check_new_content(last_training_time):
     
     return has_new_content
 
-@app.route('/')
-def dashboard():
-    stats = {
-        'total_docs': 0,
-        'total_videos': 0,
-        'categories': set(),
-        'last_training': None,
-        'needs_training': False
-    }
-    
-    docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'docs')
-    if os.path.exists(docs_dir):
-        pdfs = [f for f in os.listdir(docs_dir) if f.endswith('.pdf')]
-        stats['total_docs'] = len(pdfs)
-        if pdfs:
-            stats['categories'].add('documentation')
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
 
-    videos_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'youtube_videos.json')
-    if os.path.exists(videos_file):
-        try:
-            with open(videos_file, 'r', encoding='utf-8-sig') as f:
-                videos_data = json.load(f)
-                total_videos, video_categories = count_videos_recursive(videos_data)
-                stats['total_videos'] = total_videos
-                stats['categories'].update(video_categories)
-                
-                print(f"Videos encontrados: {total_videos}")
-                print(f"Categorías encontradas: {video_categories}")
-        except Exception as e:
-            print(f"Error loading videos: {e}")
-            import traceback
-            print(traceback.format_exc())
-    
-    kb_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'knowledge_base')
-    if os.path.exists(kb_path):
+class StatsService:
+    def __init__(self, docs_dir: str, videos_file: str, kb_path: str):
+        """
+        Admin statistics computed once and recomputed only when their inputs change
+        :param docs_dir: Directory of uploaded PDFs
+        :param videos_file: YouTube videos configuration
+        :param kb_path: Knowledge base directory
+        """
+        self.docs_dir = docs_dir
+        self.videos_file = videos_file
+        self.kb_path = kb_path
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[tuple, object]] = {}
+        self._generation = 0
+
+    def invalidate(self):
+        """Forget everything, e.g. after a training job wrote to the knowledge base"""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def _cached(self, name: str, signature: tuple, compute: Callable):
+        with self._lock:
+            signature = (self._generation,) + signature
+            entry = self._cache.get(name)
+            if entry and entry[0] == signature:
+                return entry[1]
+        value = compute()
+        with self._lock:
+            self._cache[name] = (signature, value)
+        return value
+
+    def _docs_signature(self) -> tuple:
+        # The directory mtime misses PDFs rewritten in place, so each file's mtime and size count too
+        files = []
         try:
-            files = [f for f in os.listdir(kb_path) if os.path.isfile(os.path.join(kb_path, f))]
-            if files:
-                latest_file = max(
-                    [os.path.join(kb_path, f) for f in files],
-                    key=os.path.getmtime
-                )
-                stats['last_training'] = datetime.fromtimestamp(os.path.getmtime(latest_file)).strftime('%Y-%m-%d %H:%M:%S')
-        except Exception as e:
-            print(f"Error getting last training date: {e}")
-            stats['last_training'] = None
+            with os.scandir(self.docs_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.pdf'):
+                        stat = entry.stat()
+                        files.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            pass
+        return (_mtime(self.docs_dir), tuple(sorted(files)))
 
-    last_training_time = get_last_training_time()
-    stats['needs_training'] = check_new_content(last_training_time)
-    
-    print("Stats finales:", stats)
+    def pdfs(self) -> List[str]:
+        def compute():
+            if not os.path.exists(self.docs_dir):
+                return []
+            return sorted((f for f in os.listdir(self.docs_dir) if f.endswith('.pdf')), key=str.lower)
+        return self._cached('pdfs', self._docs_signature(), compute)
+
+    def videos(self) -> Dict:
+        """Video count, categories and the flattened video list"""
+        def compute():
+            result = {'total': 0, 'categories': set(), 'items': []}
+            if not os.path.exists(self.videos_file):
+                return result
+            try:
+                with open(self.videos_file, 'r', encoding='utf-8-sig') as f:
+                    videos_data = json.load(f)
+                result['total'], result['categories'] = count_videos_recursive(videos_data)
+
+                def process_videos(data, parent_category=None):
+                    if isinstance(data, dict):
+                        for category, content in data.items():
+                            if isinstance(content, list):
+                                for video in content:
+                                    if isinstance(video, dict) and 'url' in video:
+                                        result['items'].append({
+                                            'name': video.get('title', video['url']),
+                                            'type': 'youtube',
+                                            'url': video['url'],
+                                            'category': parent_category or category
+                                        })
+                            elif isinstance(content, dict):
+                                process_videos(content, category)
+
+                if 'tutorials' in videos_data:
+                    process_videos(videos_data['tutorials'])
+                print(f"Videos encontrados: {result['total']}")
+                print(f"Categorías encontradas: {result['categories']}")
+            except Exception as e:
+                print(f"Error loading videos: {e}")
+                import traceback
+                print(traceback.format_exc())
+            return result
+        return self._cached('videos', (_mtime(self.videos_file),), compute)
+
+    def last_training(self) -> Optional[datetime]:
+        return self._cached('last_training', (_mtime(self.kb_path),), get_last_training_time)
+
+    def needs_training(self) -> bool:
+        signature = self._docs_signature() + (
+            _mtime(self.videos_file),
+            _mtime(os.path.join(self.kb_path, '.training_hashes.json')),
+            self.last_training()
+        )
+        return self._cached('needs_training', signature, lambda: check_new_content(self.last_training()))
+
+    def summary(self) -> Dict:
+        pdfs = self.pdfs()
+        videos = self.videos()
+        categories = set(videos['categories'])
+        if pdfs:
+            categories.add('documentation')
+        last_training = self.last_training()
+        return {
+            'total_docs': len(pdfs),
+            'total_videos': videos['total'],
+            'categories': categories,
+            'last_training': last_training.strftime('%Y-%m-%d %H:%M:%S') if last_training else None,
+            'needs_training': self.needs_training()
+        }
+
+    def documents(self) -> List[Dict]:
+        """PDFs then videos, each sorted by name"""
+        def compute():
+            docs = [{'name': name, 'type': 'pdf'} for name in self.pdfs()]
+            docs.extend(self.videos()['items'])
+            docs.sort(key=lambda x: (x['type'] != 'pdf', x['name'].lower()))
+            return docs
+        return self._cached('documents', self._docs_signature() + (_mtime(self.videos_file),), compute)
+
+    def query_documents(self, doc_type: Optional[str] = None, search: Optional[str] = None,
+                        category: Optional[str] = None, page: int = 1,
+                        per_page: int = DOCUMENTS_PER_PAGE) -> Tuple[List[Dict], int]:
+        """One page of the filtered document list, and the number of matches"""
+        docs = self.documents()
+        if doc_type:
+            docs = [doc for doc in docs if doc['type'] == doc_type]
+        if category:
+            docs = [doc for doc in docs if doc.get('category') == category]
+        if search:
+            search = search.lower()
+            docs = [doc for doc in docs if search in doc['name'].lower()]
+        start = (max(page, 1) - 1) * per_page
+        return docs[start:start + per_page], len(docs)
+
+stats_service = StatsService(app.config['UPLOAD_FOLDER'], VIDEOS_FILE, KB_PATH)
+
+def _document_query_args() -> Dict:
+    return {
+        'doc_type': request.args.get('type') or None,
+        'search': request.args.get('q') or None,
+        'category': request.args.get('category') or None,
+        'page': max(request.args.get('page', default=1, type=int), 1),
+        'per_page': min(max(request.args.get('per_page', default=DOCUMENTS_PER_PAGE, type=int), 1), 500)
+    }
+
+@app.route('/')
+def dashboard():
+    stats = stats_service.summary()
 
     return render_template('dashboard.html', 
                          stats=stats, 
@@ -147,98 +486,96 @@ def dashboard():
 @app.route('/api/training/start', methods=['POST'])
 def start_training():
     try:
-        global training_logs
-        training_logs = []
-        
-        def training_callback(message):
-            global training_logs
-            training_logs.append(message)
-
-        thread = Thread(target=rebuild_kb, args=(training_callback,))
-        thread.start()
-        
-        return jsonify({'success': True, 'message': 'Training started'})
+        job, created = training_scheduler.submit()
+        return jsonify({
+            'success': True,
+            'message': 'Training queued' if created else 'Training already queued',
+            'job_id': job.id,
+            'job': job.to_dict()
+        })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/training/jobs/<job_id>')
+def get_training_job(job_id):
+    job = training_scheduler.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@app.route('/api/training/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_training_job(job_id):
+    job = training_scheduler.cancel(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
 @app.route('/api/training/status')
 def get_training_status():
-    global training_logs
+    since = request.args.get('since', default=0, type=int)
+    events, truncated = training_log.since(since)
+    job = training_scheduler.latest()
     return jsonify({
         'success': True,
-        'logs': training_logs,
-        'is_training': len(training_logs) > 0 and not any('completed' in log.lower() for log in training_logs)
+        'events': events,
+        'logs': [event['message'] for event in events if event['type'] == 'log'],
+        'cursor': events[-1]['seq'] if events else min(max(since, 0), training_log.cursor),
+        'truncated': truncated,
+        'is_training': training_scheduler.is_busy(),
+        'job': job.to_dict() if job else None
     })
 
+@app.route('/api/training/events')
+def stream_training_events():
+    """Server-Sent Events feed of training events, resumable with Last-Event-ID or ?since="""
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', default=training_log.cursor, type=int)
+
+    def generate(cursor):
+        while True:
+            events, _ = training_log.wait(cursor, timeout=SSE_KEEPALIVE_SECONDS)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            cursor = events[-1]['seq']
+
+    return Response(stream_with_context(generate(since)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/docs')
 def documents():
-    docs = []
-    docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'docs')
-    if os.path.exists(docs_dir):
-        for file in os.listdir(docs_dir):
-            if file.endswith('.pdf'):
-                docs.append({
-                    'name': file,
-                    'type': 'pdf'
-                })
+    query = _document_query_args()
+    docs, total = stats_service.query_documents(**query)
+    pages = max((total + query['per_page'] - 1) // query['per_page'], 1)
     
-    videos_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'youtube_videos.json')
-    if os.path.exists(videos_file):
-        try:
-            with open(videos_file, 'r', encoding='utf-8-sig') as f:
-                videos_data = json.load(f)
-                
-                def process_videos(data, parent_category=None):
-                    if isinstance(data, dict):
-                        for category, content in data.items():
-                            if isinstance(content, list):
-                                for video in content:
-                                    if isinstance(video, dict) and 'url' in video:
-                                        docs.append({
-                                            'name': video.get('title', video['url']),
-                                            'type': 'youtube',
-                                            'url': video['url'],
-                                            'category': parent_category or category
-                                        })
-                            elif isinstance(content, dict):
-                                process_videos(content, category)
-                
-                if 'tutorials' in videos_data:
-                    process_videos(videos_data['tutorials'])
-                
-        except Exception as e:
-            print(f"Error loading videos: {e}")
-            import traceback
-            print(traceback.format_exc())
+    return render_template('documents.html', documents=docs, total=total, pages=pages,
+                           page=query['page'], per_page=query['per_page'],
+                           filters={'type': query['doc_type'] or '', 'q': query['search'] or '',
+                                    'category': query['category'] or ''})
 
-    docs.sort(key=lambda x: (x['type'] != 'pdf', x['name'].lower()))
-    
-    return render_template('documents.html', documents=docs)
+@app.route('/api/documents')
+def list_documents():
+    query = _document_query_args()
+    docs, total = stats_service.query_documents(**query)
+    return jsonify({
+        'success': True,
+        'documents': docs,
+        'total': total,
+        'page': query['page'],
+        'per_page': query['per_page']
+    })
 
 @app.route('/training')
 def training():
-    has_documents = False
-    docs_count = 0
-    videos_count = 0
-    
-    docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'docs')
-    if os.path.exists(docs_dir):
-        docs_count = len([f for f in os.listdir(docs_dir) if f.endswith('.pdf')])
-    
-    videos_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'youtube_videos.json')
-    if os.path.exists(videos_file):
-        try:
-            with open(videos_file, 'r', encoding='utf-8-sig') as f:
-                videos_data = json.load(f)
-                total_videos, _ = count_videos_recursive(videos_data)
-                videos_count = total_videos
-        except Exception as e:
-            print(f"Error loading videos: {e}")
-    
+    docs_count = len(stats_service.pdfs())
+    videos_count = stats_service.videos()['total']
     has_documents = (docs_count + videos_count) > 0
     
-    last_training_time = get_last_training_time()
-    needs_training = check_new_content(last_training_time)
+    last_training_time = stats_service.last_training()
+    needs_training = stats_service.needs_training()
     
     history = []
     if last_training_time:
@@ -257,49 +594,107 @@ def training():
                          last_training=last_training_time,
                          history=history)
 
+class UploadError(Exception):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _save_upload(stream, file_path: str) -> str:
+    """
+    Copy an upload to disk in chunks, hashing it on the way
+    :param stream: Readable binary stream of the upload
+    :param file_path: Final location; the file only appears there once it is complete and valid
+    :return: SHA-256 of the contents
+    """
+    max_size = app.config['MAX_CONTENT_LENGTH']
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.part"
+    sha256_hash = hashlib.sha256()
+    head = b''
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(head) < len(PDF_MAGIC):
+                    head += chunk[:len(PDF_MAGIC) - len(head)]
+                    if not PDF_MAGIC.startswith(head):
+                        raise UploadError('Invalid file type. Only PDF files are allowed.')
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise UploadError('File is too large.', 413)
+                sha256_hash.update(chunk)
+                f.write(chunk)
+        if head != PDF_MAGIC:
+            raise UploadError('Invalid file type. Only PDF files are allowed.')
+        # Link rather than rename so a file uploaded meanwhile under the same name is never overwritten
+        try:
+            os.link(tmp_path, file_path)
+        except FileExistsError:
+            raise UploadError('File already exists. Please rename the file or delete the existing one.')
+        except OSError:
+            if os.path.exists(file_path):
+                raise UploadError('File already exists. Please rename the file or delete the existing one.')
+            os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return sha256_hash.hexdigest()
+
 @app.route('/api/documents/upload', methods=['POST'])
 def upload_document():
+    """Accepts a multipart form with a 'file' field, or the raw PDF as the body with an X-Filename header"""
     try:
-        if 'file' not in request.files:
-            return jsonify({'success': False, 'error': 'No file part'}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
+        if request.mimetype in ('application/pdf', 'application/octet-stream'):
+            original_name = unquote(request.headers.get('X-Filename', ''))
+            stream = request.stream
+        else:
+            if 'file' not in request.files:
+                return jsonify({'success': False, 'error': 'No file part'}), 400
+            file = request.files['file']
+            original_name = file.filename
+            stream = file.stream
+
+        if not original_name:
             return jsonify({'success': False, 'error': 'No selected file'}), 400
         
-        if file and file.filename.endswith('.pdf'):
-            filename = secure_filename(file.filename)
-            docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'docs')
-            os.makedirs(docs_dir, exist_ok=True)
-            
-            file_path = os.path.join(docs_dir, filename)
-            if os.path.exists(file_path):
-                return jsonify({
-                    'success': False,
-                    'error': 'File already exists. Please rename the file or delete the existing one.'
-                }), 400
-            
-            file.save(file_path)
-            
-            processed_files = get_processed_files()
-            processed_files[filename] = {
-                'added_date': datetime.now().isoformat(),
-                'processed': False,
-                'last_modified': os.path.getmtime(file_path)
-            }
-            save_processed_files(processed_files)
-            
-            return jsonify({
-                'success': True,
-                'message': 'File uploaded successfully',
-                'filename': filename
-            })
-        else:
+        filename = secure_filename(original_name)
+        if not filename.lower().endswith('.pdf'):
             return jsonify({
                 'success': False,
                 'error': 'Invalid file type. Only PDF files are allowed.'
             }), 400
+
+        docs_dir = app.config['UPLOAD_FOLDER']
+        os.makedirs(docs_dir, exist_ok=True)
+        file_path = os.path.join(docs_dir, filename)
+        if os.path.exists(file_path):
+            return jsonify({
+                'success': False,
+                'error': 'File already exists. Please rename the file or delete the existing one.'
+            }), 400
+        
+        file_hash = _save_upload(stream, file_path)
+        digest_cache = get_digest_cache()
+        digest_cache.remember(file_path, file_hash)
+        digest_cache.save()
+        
+        get_manifest().register('pdf', filename, last_modified=os.path.getmtime(file_path))
+        job, _ = training_scheduler.submit('ingest_pdf', file_path)
+        
+        return jsonify({
+            'success': True,
+            'message': 'File uploaded successfully, indexing started',
+            'filename': filename,
+            'sha256': file_hash,
+            'job_id': job.id
+        })
             
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
+    except RequestEntityTooLarge:
+        return jsonify({'success': False, 'error': 'File is too large.'}), 413
     except Exception as e:
         print(f"Error uploading file: {e}")
         return jsonify({
@@ -307,20 +702,6 @@ def upload_document():
             'error': str(e)
         }), 500
 
-def get_processed_files():
-    """Get the processed files"""
-    processed_files_path = os.path.join(app.config['UPLOAD_FOLDER'], '.processed_files.json')
-    if os.path.exists(processed_files_path):
-        with open(processed_files_path, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_processed_files(processed_files):
-    """Save the processed files"""
-    processed_files_path = os.path.join(app.config['UPLOAD_FOLDER'], '.processed_files.json')
-    with open(processed_files_path, 'w') as f:
-        json.dump(processed_files, f, indent=2)
-
 @app.route('/api/documents/delete/<filename>', methods=['DELETE'])
 def delete_document(filename):
     try:
@@ -329,6 +710,7 @@ def delete_document(filename):
         
         if os.path.exists(file_path):
             os.remove(file_path)
+            get_manifest().remove('pdf', secure_filename(filename))
             return jsonify({
                 'success': True,
                 'message': 'File deleted successfully'
@@ -349,20 +731,21 @@ def delete_document(filename):
 @app.route('/api/documents/status')
 def get_documents_status():
     try:
-        processed_files = get_processed_files()
-        documents = []
-        
-        for filename, info in processed_files.items():
-            documents.append({
-                'filename': filename,
-                'processed': info['processed'],
-                'added_date': info['added_date'],
-                'last_processed': info.get('last_processed')
-            })
+        documents = [
+            {
+                'filename': item['key'],
+                'processed': item['status'] == PROCESSED,
+                'status': item['status'],
+                'added_date': item['added_date'],
+                'last_processed': item['last_processed'],
+                'error': item['error']
+            }
+            for item in get_manifest().list(kind='pdf', status=request.args.get('status'))
+        ]
             
         return jsonify({
             'success': True,
-            'documents': sorted(documents, key=lambda x: x['added_date'], reverse=True)
+            'documents': documents
         })
         
     except Exception as e:
@@ -1,11 +1,12 @@
 async function uploadDocument(file) {
-    const formData = new FormData();
-    formData.append('file', file);
-
     try {
         const response = await fetch('/api/documents/upload', {
             method: 'POST',
-            body: formData
+            headers: {
+                'Content-Type': 'application/pdf',
+                'X-Filename': encodeURIComponent(file.name)
+            },
+            body: file
         });
         const data = await response.json();
         if (data.success) {
@@ -54,8 +55,8 @@ async function startTraining() {
         const data = await response.json();
         
         if (data.success) {
-            showNotification('Training started successfully', 'success');
-            pollTrainingStatus();
+            showNotification(data.message || 'Training started successfully', 'success');
+            watchTraining(data.job_id);
         } else {
             showNotification('Error starting training', 'error');
         }
@@ -65,22 +66,60 @@ async function startTraining() {
     }
 }
 
-async function pollTrainingStatus() {
+const FINISHED_STATUSES = ['completed', 'failed', 'cancelled'];
+
+function handleTrainingEvent(event, jobId) {
+    if (event.job_id !== jobId) {
+        return false;
+    }
+    if (event.type === 'log') {
+        updateConsoleMessage(event.message);
+    } else if (event.type === 'progress') {
+        updateConsoleMessage(`${event.stage} (${event.progress}%)`, 'PROGRESS');
+    } else if (event.type === 'status') {
+        updateConsoleMessage(`Job ${event.job_id} ${event.status}`, 'STATUS');
+        if (FINISHED_STATUSES.includes(event.status)) {
+            showNotification(`Training ${event.status}`, event.status === 'completed' ? 'success' : 'error');
+            return true;
+        }
+    }
+    return false;
+}
+
+function watchTraining(jobId) {
+    if (!window.EventSource) {
+        pollTrainingStatus(jobId);
+        return;
+    }
+
+    let cursor = 0;
+    const source = new EventSource('/api/training/events?since=0');
+    const onEvent = (message) => {
+        const event = JSON.parse(message.data);
+        cursor = event.seq;
+        if (handleTrainingEvent(event, jobId)) {
+            source.close();
+        }
+    };
+    ['log', 'progress', 'status'].forEach(type => source.addEventListener(type, onEvent));
+    source.onerror = () => {
+        source.close();
+        pollTrainingStatus(jobId, cursor);
+    };
+}
+
+async function pollTrainingStatus(jobId, cursor = 0) {
     const pollInterval = setInterval(async () => {
         try {
-            const response = await fetch('/api/training/status');
+            const response = await fetch(`/api/training/status?since=${cursor}`);
             const data = await response.json();
             
             if (data.success) {
-                if (data.logs && data.logs.length > 0) {
-                    data.logs.forEach(log => {
-                        updateConsoleMessage(log);
-                    });
-                }
+                cursor = data.cursor;
+                const finished = data.events.some(event => handleTrainingEvent(event, jobId));
                 
-                if (!data.is_training) {
+                if (finished || !data.is_training) {
                     clearInterval(pollInterval);
-                    showNotification('Training completed', 'success');
                 }
             }
         } catch (error) {
@@ -141,9 +180,11 @@ function updateDocumentsList(documents) {
             <div class="flex items-center space-x-4">
                 <span class="text-sm font-medium">${doc.filename}</span>
                 <span class="px-2 py-1 text-xs rounded-full ${
-                    doc.processed ? 'bg-green-100 text-green-800' : 'bg-yellow-100 text-yellow-800'
-                }">
-                    ${doc.processed ? 'Processed' : 'Pending'}
+                    doc.processed ? 'bg-green-100 text-green-800' :
+                    doc.status === 'failed' ? 'bg-red-100 text-red-800' :
+                    'bg-yellow-100 text-yellow-800'
+                }" title="${doc.error || ''}">
+                    ${doc.status.charAt(0).toUpperCase() + doc.status.slice(1)}
                 </span>
             </div>
             <div class="text-sm text-gray-500">
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    def __init__(self, similarity_threshold: float = 0.95, ttl: int = 86400, max_entries: int = 500):
+        """
+        Cache of generated answers keyed by query embedding and retrieved context
+        :param similarity_threshold: Minimum cosine similarity for a hit
+        :param ttl: Entry time-to-live in seconds
+        :param max_entries: Maximum number of answers kept (LRU eviction)
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._by_context: Dict[FrozenSet[str], set] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: List[float], context_ids: Iterable[str]) -> Optional[str]:
+        """
+        Returns a cached answer for a similar query over the same context
+        :param embedding: Query embedding
+        :param context_ids: IDs of the chunks retrieved for the query
+        :return: Cached answer or None
+        """
+        context = frozenset(context_ids)
+        vector = self._normalize(embedding)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_score = None, -1.0
+            for entry_id in list(self._by_context.get(context, ())):
+                entry = self._entries[entry_id]
+                if now - entry['created'] > self.ttl:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                score = float(np.dot(vector, entry['vector']))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is not None and best_score >= self.similarity_threshold:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                return self._entries[best_id]['answer']
+
+            self.misses += 1
+            return None
+
+    def store(self, embedding: List[float], context_ids: Iterable[str], answer: str):
+        """Stores an answer for the query embedding and retrieved context"""
+        if not answer:
+            return
+        context = frozenset(context_ids)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                'vector': self._normalize(embedding),
+                'context': context,
+                'answer': answer,
+                'created': time.time()
+            }
+            self._by_context.setdefault(context, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_context.get(entry['context'])
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_context[entry['context']]
+
+    def clear(self):
+        """Clears the cache"""
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def info(self) -> Dict[str, Any]:
+        """Returns information about the cache state"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'currsize': len(self._entries),
+            'maxsize': self.max_entries
+        }
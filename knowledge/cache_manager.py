@@ -1,31 +1,60 @@
-from functools import lru_cache
-from typing import List, Dict, Any
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+import threading
 import time
 
+AGE_BUCKETS = (60, 300, 900, 1800, 3600)
+
+class _Flight:
+    """A query in progress that concurrent callers can wait on"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
 class KnowledgeCache:
-    def __init__(self, cache_size: int = 100, cache_ttl: int = 3600):
+    def __init__(self, cache_size: int = 100, cache_ttl: int = 3600, max_bytes: int = 16 * 1024 * 1024):
         """
         Initialize the cache manager
-        :param cache_size: Maximum cache size
-        :param cache_ttl: Cache time-to-live in seconds (default 1 hour)
+        :param cache_size: Maximum number of cached queries
+        :param cache_ttl: Entry time-to-live in seconds (default 1 hour)
+        :param max_bytes: Maximum estimated size of cached results in bytes
         """
+        self.cache_size = cache_size
         self.cache_ttl = cache_ttl
-        self._setup_cache(cache_size)
-
-    def _setup_cache(self, cache_size: int):
-        """Configures the cache decorator with the specified size"""
-        @lru_cache(maxsize=cache_size)
-        def cached_query(query: str, k: int) -> tuple:
-            return self.current_time, self._query_function(query, k)
-        
-        self._cached_query = cached_query
-        self.current_time = time.time()
+        self.max_bytes = max_bytes
         self._query_function = None
+        self.generation: Optional[str] = None
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Any, int, Optional[str]]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, int, Optional[str]], _Flight] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.stale = 0
+
+    def set_generation(self, generation: Optional[str]):
+        """Sets the knowledge base generation new results belong to; older entries stop matching"""
+        with self._lock:
+            self.generation = generation
 
     def set_query_function(self, query_function):
         """Sets the query function that will be cached"""
         self._query_function = query_function
 
+    @staticmethod
+    def _estimate_size(results) -> int:
+        """Approximates the memory used by a list of documents"""
+        size = 0
+        for doc in results or []:
+            content = getattr(doc, 'page_content', doc)
+            metadata = getattr(doc, 'metadata', None)
+            size += len(str(content).encode('utf-8')) + len(str(metadata or ''))
+        return size
+
     def query(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
         """
         Performs a cached query
@@ -36,26 +65,106 @@ class KnowledgeCache:
         if not self._query_function:
             raise ValueError("Query function not set")
 
-        timestamp, results = self._cached_query(query, k)
-        
-        if time.time() - timestamp > self.cache_ttl:
-            self._cached_query.cache_clear()
-            self.current_time = time.time()
-            timestamp, results = self._cached_query(query, k)
-            
-        return results
+        key = (query, k)
+        with self._lock:
+            generation = self.generation
+            flight_key = (query, k, generation)
+            entry = self._entries.get(key)
+            if entry is not None:
+                timestamp, results, _, entry_generation = entry
+                if entry_generation != generation:
+                    self._remove(key)
+                    self.stale += 1
+                elif time.time() - timestamp <= self.cache_ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return results
+                else:
+                    self._remove(key)
+                    self.expirations += 1
+
+            self.misses += 1
+            flight = self._in_flight.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._in_flight[flight_key] = flight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            results = self._query_function(query, k)
+            flight.result = results
+            self._store(key, results, generation)
+            return results
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(flight_key, None)
+            flight.event.set()
+
+    def _store(self, key: Tuple[str, int], results, generation: Optional[str]):
+        size = self._estimate_size(results)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                # The knowledge base was swapped while this query ran
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time(), results, size, generation)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.cache_size or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Tuple[str, int]):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
 
     def clear(self):
         """Clears the cache"""
-        self._cached_query.cache_clear()
-        self.current_time = time.time()
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
 
     def info(self) -> Dict[str, Any]:
         """Returns information about the cache state"""
-        cache_info = self._cached_query.cache_info()
+        now = time.time()
+        with self._lock:
+            ages = [now - timestamp for timestamp, _, _, _ in self._entries.values()]
+            currsize = len(self._entries)
+            currbytes = self._bytes
+
+        histogram = {}
+        lower = 0
+        for upper in AGE_BUCKETS:
+            histogram[f'{lower}-{upper}s'] = sum(1 for age in ages if lower <= age < upper)
+            lower = upper
+        histogram[f'{lower}s+'] = sum(1 for age in ages if age >= lower)
+
+        lookups = self.hits + self.misses
         return {
-            'hits': cache_info.hits,
-            'misses': cache_info.misses,
-            'maxsize': cache_info.maxsize,
-            'currsize': cache_info.currsize
-        } 
\ No newline at end of file
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'coalesced': self.coalesced,
+            'stale': self.stale,
+            'generation': self.generation,
+            'maxsize': self.cache_size,
+            'currsize': currsize,
+            'max_bytes': self.max_bytes,
+            'currbytes': currbytes,
+            'age_histogram': histogram
+        }
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+def hash_file(filepath: str) -> str:
+    """SHA-256 of a file's contents, read in large blocks"""
+    with open(filepath, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        sha256_hash = hashlib.sha256()
+        for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            sha256_hash.update(block)
+        return sha256_hash.hexdigest()
+
+class FileDigestCache:
+    def __init__(self, cache_path: str = "./cache/file_digests.json", max_workers: int = 4):
+        """
+        Content digests cached by (inode, mtime, size) so unchanged files are never re-read
+        :param cache_path: JSON file the digests are persisted to
+        :param max_workers: Threads used to hash a directory
+        """
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hashed = 0
+        self.reused = 0
+        self._entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load digest cache {self.cache_path}: {str(e)}")
+            return {}
+
+    def digest(self, filepath: str) -> str:
+        """Content digest of a file, hashing it only if its stat signature changed"""
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        signature = [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry['stat'] == signature:
+                self.reused += 1
+                return entry['digest']
+
+        digest = hash_file(path)
+        with self._lock:
+            self._entries[path] = {'stat': signature, 'digest': digest}
+            self._dirty = True
+            self.hashed += 1
+        return digest
+
+    def remember(self, filepath: str, digest: str):
+        """Records a digest computed elsewhere, e.g. while the file was being written"""
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        with self._lock:
+            self._entries[path] = {'stat': [stat.st_ino, stat.st_mtime_ns, stat.st_size], 'digest': digest}
+            self._dirty = True
+
+    def digest_directory(self, directory: str, suffix: str = '.pdf') -> Dict[str, str]:
+        """Digests of the files in a directory with the given suffix, keyed by filename"""
+        if not os.path.exists(directory):
+            return {}
+        filenames = sorted(f for f in os.listdir(directory) if f.endswith(suffix))
+        paths = [os.path.join(directory, f) for f in filenames]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            digests = list(executor.map(self.digest, paths))
+        return dict(zip(filenames, digests))
+
+    def save(self):
+        """Persists the digests, dropping entries for files that no longer exist"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._entries = {path: entry for path, entry in self._entries.items() if os.path.exists(path)}
+            entries = dict(self._entries)
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.cache_path)
+
+_digest_cache: Optional[FileDigestCache] = None
+_digest_cache_lock = threading.Lock()
+
+def get_digest_cache() -> FileDigestCache:
+    """Process-wide digest cache shared by the builder and the frontend"""
+    global _digest_cache
+    with _digest_cache_lock:
+        if _digest_cache is None:
+            _digest_cache = FileDigestCache(os.getenv('FILE_DIGEST_CACHE_PATH', './cache/file_digests.json'))
+        return _digest_cache
@@ -0,0 +1,18 @@
+import hashlib
+
+
+def chunk_key(doc) -> str:
+    """Stable identifier for a retrieved chunk, falling back to a content hash"""
+    doc_id = getattr(doc, 'id', None)
+    if doc_id:
+        return str(doc_id)
+    source = doc.metadata.get('source', '') if doc.metadata else ''
+    content = f"{source}\n{doc.page_content}"
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def make_chunk_id(source: str, page, text: str) -> str:
+    """Deterministic chunk ID derived from its source, page and content"""
+    content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    key = f"{source}\0{page if page is not None else ''}\0{content_hash}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
@@ -1,38 +1,108 @@
 import os
 import json
-import requests
-from bs4 import BeautifulSoup
-from langchain_community.document_loaders import PyPDFLoader
+import threading
+import time
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import Callable, List, Dict
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import cached_property
+from urllib.parse import urlparse, parse_qs
 from .cache_manager import KnowledgeCache
+from .embedding_store import EmbeddingStore, CachedEmbeddings
+from .lexical_index import BM25Index, reciprocal_rank_fusion
+from .generations import GenerationStore
+from .chunk_ids import chunk_key, make_chunk_id
+from .web_fetcher import WebFetcher
+from .html_extractor import iter_text_blocks, iter_chunks
+from .pdf_pipeline import parse_pdfs
+from .embedding_batcher import EmbeddingBatcher
+from chromadb.api.shared_system_client import SharedSystemClient
 from chromadb.config import Settings
 
 load_dotenv()
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+KNOWLEDGE_BASE_DIR = "./knowledge_base"
+LEXICAL_INDEX_FILE = "bm25_index.json"
+HTTP_CACHE_FILE = ".http_cache.json"
+WEB_SPLIT_WINDOW = 8000
+
 class DexKitKnowledgeBase:
     def __init__(self, chunk_size: int = 300, chunk_overlap: int = 30):
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            api_key=os.getenv('OPENAI_API_KEY')
+        self.embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(
+                model=EMBEDDING_MODEL,
+                api_key=os.getenv('OPENAI_API_KEY')
+            ),
+            model=EMBEDDING_MODEL,
+            store=EmbeddingStore(os.getenv('EMBEDDING_CACHE_PATH', './cache/embeddings.sqlite3'))
         )
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.db = None
-        self.youtube_metadata = self._load_youtube_metadata()
-        self.docs_metadata = self._load_docs_metadata()
-        self.platform_urls = self._load_platform_urls()
+        self.pdf_workers = int(os.getenv('PDF_WORKERS', '0')) or None
+        self.generations = GenerationStore(
+            KNOWLEDGE_BASE_DIR,
+            keep=int(os.getenv('KB_GENERATIONS_KEPT', '3')),
+            grace_seconds=float(os.getenv('KB_GENERATION_GRACE_SECONDS', '600'))
+        )
+        self.generation = self.generations.current()
+        self.building_generation = None
+        self.persist_directory = self.generations.path(self.generation)
+        self.lexical_index = BM25Index.load(os.path.join(self.persist_directory, LEXICAL_INDEX_FILE))
+        self._retriever = (None, self.lexical_index)
+        self._retriever_lock = threading.Lock()
+        self._retriever_users = {}
+        self._retired_stores = {}
         self.cache = KnowledgeCache(cache_size=100, cache_ttl=3600)
+        self.web_timings = {}
+        self._query_embeddings = OrderedDict()
+        self._query_embeddings_size = 1024
+        self._query_embeddings_lock = threading.Lock()
+
+    # Ingestion-only state is built on first use, so serving the bot never pays for it
+
+    @cached_property
+    def youtube_metadata(self) -> Dict:
+        return self._load_youtube_metadata()
+
+    @cached_property
+    def youtube_index(self) -> Dict[str, Dict]:
+        return self._build_youtube_index(self.youtube_metadata)
+
+    @cached_property
+    def docs_metadata(self) -> Dict:
+        return self._load_docs_metadata()
+
+    @cached_property
+    def platform_urls(self) -> Dict:
+        return self._load_platform_urls()
+
+    @cached_property
+    def embedding_batcher(self) -> EmbeddingBatcher:
+        return EmbeddingBatcher(
+            max_tokens_per_batch=int(os.getenv('EMBEDDING_BATCH_TOKENS', '50000')),
+            concurrency=int(os.getenv('EMBEDDING_CONCURRENCY', '4'))
+        )
+
+    @cached_property
+    def web_fetcher(self) -> WebFetcher:
+        return WebFetcher(
+            cache_path=os.path.join(self.persist_directory, HTTP_CACHE_FILE),
+            max_workers=int(os.getenv('WEB_FETCH_WORKERS', '8')),
+            per_host=int(os.getenv('WEB_FETCH_PER_HOST', '4')),
+            timeout=float(os.getenv('WEB_FETCH_TIMEOUT', '15'))
+        )
         
     def _load_youtube_metadata(self) -> Dict:
         """Load YouTube metadata from config file"""
         try:
             config_path = 'config/youtube_videos.json'
-            print(f"Loading YouTube metadata from: {os.path.abspath(config_path)}")
             
             if not os.path.exists(config_path):
                 print(f"Error: File not found at {config_path}")
@@ -42,11 +112,8 @@ class DexKitKnowledgeBase:
                 content = f.read().decode('utf-8-sig').strip()
                 if content.startswith(u'\ufeff'):
                     content = content[1:]
-                print(f"First 100 characters of file: {content[:100]}")
-                
                 try:
                     data = json.loads(content)
-                    print("JSON loaded successfully")
                     return data.get('tutorials', {})
                 except json.JSONDecodeError as je:
                     print(f"JSON Error at position {je.pos}: {je.msg}")
@@ -78,69 +145,73 @@ class DexKitKnowledgeBase:
         
     def get_video_id(self, url: str) -> str:
         """Extract the video ID from a YouTube URL"""
-        video_id = url.split('/')[-1]
-        if 'watch?v=' in video_id:
-            video_id = video_id.split('watch?v=')[-1]
-        return video_id
+        parsed = urlparse(url.strip())
+        query_id = parse_qs(parsed.query).get('v')
+        if query_id:
+            return query_id[0]
+        path_parts = [part for part in parsed.path.split('/') if part]
+        if path_parts:
+            return path_parts[-1]
+        return url.strip()
+
+    def _build_youtube_index(self, tutorials: Dict) -> Dict[str, Dict]:
+        """Map video IDs to their metadata, walking the nested tutorials tree once"""
+        index = {}
         
-    def process_pdf(self, pdf_directory: str) -> List[Document]:
-        """Process PDF documents with improved chunking"""
-        documents = []
-        for filename in os.listdir(pdf_directory):
-            if filename.endswith('.pdf'):
-                try:
-                    pdf_path = os.path.join(pdf_directory, filename)
-                    print(f"Processing PDF: {pdf_path}")
-                    
-                    loader = PyPDFLoader(pdf_path)
-                    pages = loader.load()
-                    
-                    text_splitter = RecursiveCharacterTextSplitter(
-                        chunk_size=self.chunk_size,
-                        chunk_overlap=self.chunk_overlap,
-                        separators=["\n\n", "\n", ". ", " ", ""]
-                    )
-                    
-                    for page in pages:
-                        chunks = text_splitter.split_text(page.page_content)
-                        for chunk in chunks:
-                            if len(chunk.strip()) > 50:
-                                doc = Document(
-                                    page_content=chunk,
-                                    metadata={
-                                        'source': filename,
-                                        'type': 'pdf',
-                                        'page': page.metadata.get('page', 0)
-                                    }
-                                )
-                                documents.append(doc)
-                                print(f"Added chunk from page {page.metadata.get('page', 0)}")
-                    
-                    print(f"Successfully processed PDF: {filename} - Generated {len(documents)} chunks")
-                except Exception as e:
-                    print(f"Error processing PDF {filename}: {str(e)}")
-                    import traceback
-                    print(traceback.format_exc())
+        def walk(node):
+            if isinstance(node, dict):
+                if isinstance(node.get('url'), str):
+                    index.setdefault(self.get_video_id(node['url']), node)
+                    return
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for item in node:
+                    walk(item)
         
+        walk(tutorials)
+        return index
+        
+    def _parse_pdfs(self, pdf_paths: List[str], errors: Dict[str, str] = None,
+                    progress: Callable[[int, int], None] = None) -> List[Document]:
+        """Parse PDFs in worker processes and wrap the chunk records as documents"""
+        started = time.perf_counter()
+        records = parse_pdfs(
+            pdf_paths,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            max_workers=self.pdf_workers,
+            errors=errors,
+            progress=progress
+        )
+        documents = [
+            Document(
+                page_content=record.text,
+                metadata={
+                    'source': record.source,
+                    'type': 'pdf',
+                    'page': record.page
+                }
+            )
+            for record in records
+        ]
+        print(f"Parsed {len(pdf_paths)} PDFs into {len(documents)} chunks "
+              f"in {time.perf_counter() - started:.2f}s")
         return documents
+
+    def process_pdf(self, pdf_directory: str) -> List[Document]:
+        """Process PDF documents with improved chunking"""
+        pdf_paths = [
+            os.path.join(pdf_directory, filename)
+            for filename in sorted(os.listdir(pdf_directory))
+            if filename.endswith('.pdf')
+        ]
+        return self._parse_pdfs(pdf_paths)
         
     def process_youtube(self, video_url: str) -> List[Document]:
         """Process a YouTube video metadata without transcripts"""
         try:
-            video_data = None
-            for category, content in self.youtube_metadata.get('tutorials', {}).items():
-                if isinstance(content, dict):
-                    for subcategory, videos in content.items():
-                        if isinstance(videos, list):
-                            for video in videos:
-                                if video.get('url') == video_url:
-                                    video_data = video
-                                    break
-                elif isinstance(content, list):
-                    for video in content:
-                        if video.get('url') == video_url:
-                            video_data = video
-                            break
+            video_data = self.youtube_index.get(self.get_video_id(video_url))
 
             if not video_data:
                 print(f"Warning: No metadata found for video: {video_url}")
@@ -168,8 +239,8 @@ class DexKitKnowledgeBase:
                         'priority': video_data.get('priority', 0),
                         'language': video_data.get('language', ''),
                         'difficulty': video_data.get('difficulty', ''),
-                        'topics': video_data.get('topics', []),
-                        'related_docs': video_data.get('related_docs', [])
+                        'topics': ', '.join(video_data.get('topics', [])),
+                        'related_docs': ', '.join(video_data.get('related_docs', []))
                     }
                 )
             ]
@@ -182,78 +253,191 @@ class DexKitKnowledgeBase:
         """Process web documentation and platform pages"""
         documents = []
         
-        def extract_content(url: str, section: str, category: str) -> Dict:
-            try:
-                response = requests.get(url)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                for element in soup.find_all(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-                    element.decompose()
-                
-                main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
-                if main_content:
-                    text = main_content.get_text(separator='\n', strip=True)
-                else:
-                    text = soup.get_text(separator='\n', strip=True)
-                
-                text = text[:5000]
-                
-                return {
-                    'content': text,
-                    'url': url,
-                    'section': section,
-                    'category': category
-                }
-            except Exception as e:
-                print(f"Warning: Could not process URL {url}: {str(e)}")
-                return None
-        
-        def process_urls_recursively(data: Dict, category: str = "", section: str = ""):
+        def collect_urls(data: Dict, targets: List[Dict], category: str = "", section: str = ""):
             for key, value in data.items():
                 if isinstance(value, str) and value.startswith('http'):
-                    content = extract_content(value, section or key, category)
-                    if content:
-                        text_splitter = RecursiveCharacterTextSplitter(
-                            chunk_size=1000,
-                            chunk_overlap=200
-                        )
-                        splits = text_splitter.split_text(content['content'])
-                        
-                        for split in splits:
-                            documents.append(Document(
-                                page_content=split,
-                                metadata={
-                                    'source': content['url'],
-                                    'type': 'web_page',
-                                    'section': content['section'],
-                                    'category': content['category']
-                                }
-                            ))
-                        print(f"Successfully processed: {value}")
+                    targets.append({'url': value, 'section': section or key, 'category': category})
                 elif isinstance(value, dict):
-                    process_urls_recursively(value, category or key, section or key)
+                    collect_urls(value, targets, category or key, section or key)
         
-        print("\nProcessing documentation pages...")
-        process_urls_recursively(self.docs_metadata)
+        targets = []
+        collect_urls(self.docs_metadata, targets)
+        collect_urls(self.platform_urls, targets)
+        
+        print(f"\nFetching {len(targets)} documentation and platform pages...")
+        results = self.web_fetcher.fetch_all([target['url'] for target in targets])
+        
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200
+        )
+        self.web_timings = {}
+        seen_urls = set()
+        unchanged = 0
+        for target in targets:
+            url = target['url']
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            
+            result = results[url]
+            if result.status == 'not_modified':
+                unchanged += 1
+                continue
+            if result.status == 'error':
+                print(f"Warning: Could not process URL {url}: {result.error}")
+                continue
+            
+            started = time.perf_counter()
+            page_documents = []
+            try:
+                blocks = iter_text_blocks(result.text)
+                for split in iter_chunks(blocks, text_splitter, window=WEB_SPLIT_WINDOW):
+                    page_documents.append(Document(
+                        page_content=split,
+                        metadata={
+                            'source': url,
+                            'type': 'web_page',
+                            'section': target['section'],
+                            'category': target['category']
+                        }
+                    ))
+            except Exception as e:
+                print(f"Warning: Could not process URL {url}: {str(e)}")
+                continue
+            
+            extract_time = time.perf_counter() - started
+            self.web_timings[url] = {
+                'fetch_seconds': result.elapsed,
+                'extract_seconds': extract_time,
+                'chunks': len(page_documents)
+            }
+            documents.extend(page_documents)
+            self.web_fetcher.stage(result)
+            print(f"Successfully processed: {url} ({len(page_documents)} chunks, "
+                  f"fetch {result.elapsed:.2f}s, extract {extract_time:.3f}s)")
         
-        print("\nProcessing platform pages...")
-        process_urls_recursively(self.platform_urls)
+        if unchanged:
+            print(f"Skipped {unchanged} unchanged pages (HTTP 304)")
+        if self.web_timings:
+            total_extract = sum(timing['extract_seconds'] for timing in self.web_timings.values())
+            print(f"Extracted {len(self.web_timings)} pages in {total_extract:.2f}s")
         
         return documents
 
+    def _open_directory(self, path: str):
+        """Vector store and lexical index persisted in a knowledge base directory"""
+        db = Chroma(
+            persist_directory=path,
+            embedding_function=self.embeddings,
+            client_settings=Settings(
+                anonymized_telemetry=False,
+                allow_reset=True,
+                is_persistent=True
+            )
+        )
+        return db, BM25Index.load(os.path.join(path, LEXICAL_INDEX_FILE))
+
+    @staticmethod
+    def _close_store(db):
+        """Stop the Chroma system behind a store; chromadb caches one per path until it is evicted"""
+        identifier = db._client._identifier
+        system = SharedSystemClient._identifier_to_system.pop(identifier, None)
+        if system is not None:
+            system.stop()
+
+    def _use_directory(self, path: str, db, lexical_index):
+        with self._retriever_lock:
+            previous = self._retriever[0]
+            self.persist_directory = path
+            self.db = db
+            self.lexical_index = lexical_index
+            # Queries read both stores from one tuple, so a swap never mixes generations
+            self._retriever = (db, lexical_index)
+            if previous is not None and previous is not db and previous._client._identifier != db._client._identifier:
+                if self._retriever_users.get(id(previous)):
+                    # Closed by the last query still reading it
+                    self._retired_stores[id(previous)] = previous
+                else:
+                    self._close_store(previous)
+        if 'web_fetcher' in self.__dict__:
+            self.web_fetcher.set_cache_path(os.path.join(path, HTTP_CACHE_FILE))
+
+    @contextmanager
+    def _lease_retriever(self):
+        """The current (db, lexical_index) tuple, kept open until the caller is done with it"""
+        with self._retriever_lock:
+            retriever = self._retriever
+            key = id(retriever[0])
+            self._retriever_users[key] = self._retriever_users.get(key, 0) + 1
+        try:
+            yield retriever
+        finally:
+            with self._retriever_lock:
+                self._retriever_users[key] -= 1
+                if not self._retriever_users[key]:
+                    del self._retriever_users[key]
+                    retired = self._retired_stores.pop(key, None)
+                    if retired is not None:
+                        self._close_store(retired)
+
+    def load_knowledge_base(self):
+        """Open the published knowledge base generation without processing any sources"""
+        generation = self.generations.current()
+        path = self.generations.path(generation)
+        self._use_directory(path, *self._open_directory(path))
+        self.generation = generation
+        self.cache.set_generation(generation)
+        self.cache.set_query_function(self._raw_query_knowledge)
+
+    def refresh_generation(self) -> bool:
+        """Swap in a newly published generation, if any; returns whether it changed"""
+        generation = self.generations.current()
+        if generation == self.generation:
+            return False
+        path = self.generations.path(generation)
+        db, lexical_index = self._open_directory(path)
+        self._use_directory(path, db, lexical_index)
+        self.generation = generation
+        self.cache.set_generation(generation)
+        return True
+
+    def begin_generation(self, copy_current: bool = True) -> str:
+        """
+        Start building a new generation; readers keep using the published one until it is published
+        :param copy_current: Update a copy of the published generation instead of starting empty
+        """
+        generation = self.generations.create(copy_current=copy_current)
+        path = self.generations.path(generation)
+        self._use_directory(path, *self._open_directory(path))
+        self.building_generation = generation
+        return generation
+
+    def publish_generation(self):
+        """Atomically make the generation being built the one readers use"""
+        if not self.building_generation:
+            raise ValueError("No generation is being built")
+        self.generations.publish(self.building_generation)
+        self.generation = self.building_generation
+        self.building_generation = None
+        self.cache.set_generation(self.generation)
+
+    def abandon_generation(self):
+        """Discard the generation being built and reopen the published one"""
+        building_generation, self.building_generation = self.building_generation, None
+        # Close the generation's store before deleting its directory
+        self.load_knowledge_base()
+        if building_generation:
+            self.generations.discard(building_generation)
+
     def create_knowledge_base(self, pdf_directory: str = None, youtube_urls: List[str] = None):
         """Create or load knowledge base"""
         if os.getenv('SKIP_DOC_PROCESSING'):
-            self.db = Chroma(
-                persist_directory="./knowledge_base",
-                embedding_function=self.embeddings,
-                client_settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True,
-                    is_persistent=True
-                )
-            )
+            # Reloading would point db back at the published generation mid-build
+            if self.building_generation:
+                self.cache.set_query_function(self._raw_query_knowledge)
+            else:
+                self.load_knowledge_base()
             return
         
         documents = []
@@ -279,27 +463,131 @@ class DexKitKnowledgeBase:
         
         print(f"\nCreating vector knowledge base with {len(documents)} total documents...")
         
-        self.db = Chroma(
-            persist_directory="./knowledge_base",
-            embedding_function=self.embeddings,
-            client_settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True,
-                is_persistent=True
-            )
-        )
+        if not self.db:
+            self._use_directory(self.persist_directory, *self._open_directory(self.persist_directory))
         
-        self.db.add_documents(documents)
+        self.upsert_documents(documents)
+        self.web_fetcher.commit()
         
+        embedding_stats = self.embeddings.stats()
+        print(f"Embeddings: {embedding_stats['reused']} reused from cache, {embedding_stats['computed']} computed")
         print("✅ Knowledge base created successfully!")
         
         self.cache.set_query_function(self._raw_query_knowledge)
 
-    def _raw_query_knowledge(self, query: str, k: int = 3):
-        """Raw query function without cache"""
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query, reusing recent embeddings of the same text"""
+        with self._query_embeddings_lock:
+            embedding = self._query_embeddings.get(query)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(query)
+                return embedding
+        
+        embedding = self.embeddings.embed_query(query)
+        with self._query_embeddings_lock:
+            self._query_embeddings[query] = embedding
+            while len(self._query_embeddings) > self._query_embeddings_size:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+
+    def _add_documents(self, documents: List[Document]):
+        """Add chunks to the vector store and the lexical index under shared IDs"""
+        if not documents:
+            return
+        ids = [self._document_id(doc) for doc in documents]
+        
+        def write_batch(batch: List[Document], batch_ids: List[str], vectors: List[List[float]]):
+            # Write the batcher's vectors directly; add_documents would embed (and count) them again
+            self.db._collection.upsert(
+                ids=batch_ids,
+                embeddings=vectors,
+                documents=[doc.page_content for doc in batch],
+                metadatas=[doc.metadata for doc in batch]
+            )
+            self.lexical_index.add_documents(batch_ids, batch)
+        
+        try:
+            stats = self.embedding_batcher.run(documents, ids, self.embeddings.embed_documents, write_batch)
+        finally:
+            self.lexical_index.save()
+        print(f"Embedded {stats['chunks']} chunks in {stats['batches']} batches: "
+              f"{stats['chunks_per_second']:.1f} chunks/s, {stats['tokens_per_second']:.0f} tokens/s"
+              + (f", {stats['rate_limited']} rate-limited retries" if stats['rate_limited'] else ""))
+
+    @staticmethod
+    def _document_id(doc: Document) -> str:
+        return make_chunk_id(doc.metadata.get('source', ''), doc.metadata.get('page'), doc.page_content)
+
+    def upsert_documents(self, documents: List[Document], sources: List[str] = None):
+        """
+        Replace the chunks of every source in documents (and of any extra sources given)
+        :param documents: New chunks, grouped by their 'source' metadata
+        :param sources: Additional sources whose chunks should be removed if they have none left
+        """
         if not self.db:
             raise ValueError("Knowledge base not initialized")
-        return self.db.similarity_search(query, k=k)
+        
+        unique_docs = {}
+        for doc in documents:
+            unique_docs.setdefault(self._document_id(doc), doc)
+        
+        all_sources = sorted({doc.metadata.get('source', '') for doc in documents} | set(sources or []))
+        if not all_sources:
+            return
+        
+        existing_ids = set()
+        for start in range(0, len(all_sources), 100):
+            batch_sources = all_sources[start:start + 100]
+            existing = self.db.get(where={"source": {"$in": batch_sources}}, include=[])
+            existing_ids.update(existing['ids'])
+        
+        stale_ids = sorted(existing_ids - unique_docs.keys())
+        if stale_ids:
+            for start in range(0, len(stale_ids), 500):
+                self.db.delete(ids=stale_ids[start:start + 500])
+            self.lexical_index.delete(stale_ids)
+            self.lexical_index.save()
+        
+        new_docs = [doc for doc_id, doc in unique_docs.items() if doc_id not in existing_ids]
+        print(f"Upsert over {len(all_sources)} sources: {len(new_docs)} new chunks, "
+              f"{len(unique_docs) - len(new_docs)} unchanged, {len(stale_ids)} removed")
+        self._add_documents(new_docs)
+
+    @staticmethod
+    def _vector_search(db, embedding: List[float], k: int) -> List[Document]:
+        """Nearest chunks carrying their store IDs, which are the IDs the BM25 index uses"""
+        # similarity_search_by_vector drops the IDs, so query the collection directly
+        results = db._collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            include=['documents', 'metadatas']
+        )
+        return [
+            Document(page_content=text or '', metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(results['ids'][0], results['documents'][0], results['metadatas'][0])
+        ]
+
+    def _raw_query_knowledge(self, query: str, k: int = 3):
+        """Raw query function without cache, fusing vector and BM25 rankings"""
+        with self._lease_retriever() as (db, lexical_index):
+            if db is None:
+                raise ValueError("Knowledge base not initialized")
+            fetch_k = k * 4
+            vector_docs = self._vector_search(db, self.embed_query(query), fetch_k)
+            lexical_hits = lexical_index.search(query, k=fetch_k)
+        if not lexical_hits:
+            return vector_docs[:k]
+        
+        candidates = {chunk_key(doc): doc for doc in vector_docs}
+        for doc_id, _ in lexical_hits:
+            if doc_id not in candidates:
+                candidates[doc_id] = lexical_index.get_document(doc_id)
+        
+        fused = reciprocal_rank_fusion([
+            [chunk_key(doc) for doc in vector_docs],
+            [doc_id for doc_id, _ in lexical_hits]
+        ])
+        return [candidates[doc_id] for doc_id in fused[:k]]
         
     def query_knowledge(self, query: str, k: int = 3):
         """Query function with cache"""
@@ -309,70 +597,34 @@ class DexKitKnowledgeBase:
             print(f"Cache error, falling back to direct query: {str(e)}")
             return self._raw_query_knowledge(query, k)
 
-    def process_new_pdfs(self, pdf_paths: List[str]) -> List[Document]:
-        """Process new PDFs incrementally with batch processing"""
-        BATCH_SIZE = 50
-        documents = []
-        current_batch = []
+    def process_new_pdfs(self, pdf_paths: List[str], errors: Dict[str, str] = None,
+                         progress: Callable[[int, int], None] = None) -> List[Document]:
+        """
+        Process new PDFs incrementally with batched embedding, parsing all of them in one fan-out
+        :param pdf_paths: PDFs to parse and index
+        :param errors: Filled with an error per PDF path that failed to parse; those PDFs keep their old chunks
+        :param progress: Called with (PDFs parsed, total PDFs)
+        """
+        errors = {} if errors is None else errors
+        pdf_paths = [path for path in pdf_paths if os.path.isfile(path) and path.endswith('.pdf')]
+        documents = self._parse_pdfs(pdf_paths, errors=errors, progress=progress)
         
-        for pdf_path in pdf_paths:
-            if os.path.isfile(pdf_path) and pdf_path.endswith('.pdf'):
-                try:
-                    loader = PyPDFLoader(pdf_path)
-                    pages = loader.load()
-                    
-                    text_splitter = RecursiveCharacterTextSplitter(
-                        chunk_size=self.chunk_size,
-                        chunk_overlap=self.chunk_overlap,
-                        separators=["\n\n", "\n", ". ", " ", ""]
-                    )
-                    
-                    for page in pages:
-                        chunks = text_splitter.split_text(page.page_content)
-                        for chunk in chunks:
-                            if len(chunk.strip()) > 50:
-                                doc = Document(
-                                    page_content=chunk,
-                                    metadata={
-                                        'source': os.path.basename(pdf_path),
-                                        'type': 'pdf',
-                                        'page': page.metadata.get('page', 0)
-                                    }
-                                )
-                                current_batch.append(doc)
-                                documents.append(doc)
-                                print(f"Added chunk from {os.path.basename(pdf_path)} page {page.metadata.get('page', 0)}")
-                                
-                                if len(current_batch) >= BATCH_SIZE:
-                                    if self.db:
-                                        self.db.add_documents(current_batch)
-                                        print(f"Processed batch of {len(current_batch)} chunks")
-                                    current_batch = []
-                
-                except Exception as e:
-                    print(f"Error processing PDF {pdf_path}: {str(e)}")
-                
-        if current_batch and self.db:
-            try:
-                self.db.add_documents(current_batch)
-                print(f"Processed final batch of {len(current_batch)} chunks")
-            except Exception as e:
-                print(f"Error processing final batch: {str(e)}")
+        failed_sources = {os.path.basename(path) for path in errors}
+        documents = [doc for doc in documents if doc.metadata['source'] not in failed_sources]
+        sources = [os.path.basename(path) for path in pdf_paths if path not in errors]
+        if self.db and sources:
+            self.upsert_documents(documents, sources=sources)
         
         return documents
 
     def process_new_videos(self, video_urls: List[str]) -> List[Document]:
-        """Process new YouTube videos incrementally"""
+        """Process new YouTube videos in one pass and one embedding batch"""
         documents = []
         for url in video_urls:
-            try:
-                video_docs = self.process_youtube(url)
-                documents.extend(video_docs)
-            except Exception as e:
-                print(f"Error processing video {url}: {str(e)}")
+            documents.extend(self.process_youtube(url))
         
         if documents and self.db:
-            self.db.add_documents(documents)
+            self.upsert_documents(documents, sources=video_urls)
             print(f"Added {len(documents)} new video chunks to knowledge base")
         
         return documents
\ No newline at end of file
@@ -1,6 +1,7 @@
 import json
 import os
-from typing import List, Dict
+import heapq
+from typing import List, Dict, FrozenSet, Set
 from dataclasses import dataclass
 import requests
 
@@ -10,10 +11,33 @@ class DocReference:
     title: str
     description: str
 
+@dataclass
+class IndexedDoc:
+    doc: DocReference
+    terms: FrozenSet[str]
+    url_lower: str
+    is_thirdweb: bool
+    order: int
+
+PRIORITY_TERMS = {
+    'contract': {
+        'high': {'contract', 'token', 'erc20', 'erc721', 'erc1155', 'thirdweb'},
+        'medium': {'deploy', 'create', 'mint', 'airdrop', 'stake'},
+        'low': {'manage', 'update', 'list'}
+    },
+    'dapp': {
+        'high': {'dapp', 'application', 'builder'},
+        'medium': {'template', 'customize', 'configure'},
+        'low': {'manage', 'update'}
+    }
+}
+
 class DocumentationManager:
     def __init__(self, config_path: str = "config/documentation_urls.json"):
         self.config_path = config_path
         self.docs_map: Dict[str, DocReference] = {}
+        self.indexed_docs: Dict[str, IndexedDoc] = {}
+        self.term_index: Dict[str, Set[str]] = {}
         self.load_documentation()
     
     def load_documentation(self):
@@ -23,7 +47,10 @@ class DocumentationManager:
             
         with open(self.config_path, 'r') as f:
             self.config = json.load(f)
-            
+        
+        self.docs_map = {}
+        self.indexed_docs = {}
+        self.term_index = {}
         self._flatten_urls(self.config, max_depth=2)
     
     def _flatten_urls(self, config: dict, prefix: str = "", current_depth: int = 0, max_depth: int = 2):
@@ -39,11 +66,11 @@ class DocumentationManager:
                     base = config.get("base_url", prefix)
                     full_url = base + value
                 
-                self.docs_map[key] = DocReference(
+                self._index_doc(key, DocReference(
                     url=full_url,
                     title=key.replace("_", " ").title(),
                     description=""
-                )
+                ))
             elif isinstance(value, dict):
                 new_prefix = config.get("base_url", prefix)
                 self._flatten_urls(
@@ -53,54 +80,61 @@ class DocumentationManager:
                     max_depth
                 )
     
+    def _index_doc(self, key: str, doc: DocReference):
+        """Register a doc and its precomputed terms in the inverted index"""
+        previous = self.indexed_docs.get(key)
+        if previous:
+            for term in previous.terms:
+                self.term_index[term].discard(key)
+        
+        key_terms = set(key.lower().replace('-', '_').split('_'))
+        path_terms = set(doc.url.lower().split('/'))
+        terms = frozenset(key_terms | path_terms)
+        
+        self.docs_map[key] = doc
+        self.indexed_docs[key] = IndexedDoc(
+            doc=doc,
+            terms=terms,
+            url_lower=doc.url.lower(),
+            is_thirdweb='thirdweb' in key_terms,
+            order=previous.order if previous else len(self.indexed_docs)
+        )
+        for term in terms:
+            self.term_index.setdefault(term, set()).add(key)
+    
     def find_relevant_docs(self, query: str, max_results: int = 3) -> List[DocReference]:
         """Find relevant documentation links for a given query with limit"""
         query_terms = set(query.lower().split())
         
-        priority_terms = {
-            'contract': {
-                'high': {'contract', 'token', 'erc20', 'erc721', 'erc1155', 'thirdweb'},
-                'medium': {'deploy', 'create', 'mint', 'airdrop', 'stake'},
-                'low': {'manage', 'update', 'list'}
-            },
-            'dapp': {
-                'high': {'dapp', 'application', 'builder'},
-                'medium': {'template', 'customize', 'configure'},
-                'low': {'manage', 'update'}
-            }
-        }
+        query_bonus = 0
+        contract_high = False
+        for category, terms in PRIORITY_TERMS.items():
+            if query_terms & terms['high']:
+                if category == 'contract':
+                    contract_high = True
+                query_bonus += 2
+            if query_terms & terms['medium']:
+                query_bonus += 1
+            if query_terms & terms['low']:
+                query_bonus += 0.5
+        
+        candidates = set()
+        for term in query_terms:
+            candidates.update(self.term_index.get(term, ()))
         
         scored_docs = []
-        for key, doc in self.docs_map.items():
-            key_terms = set(key.lower().replace('-', '_').split('_'))
-            path_terms = set(doc.url.lower().split('/'))
-            
-            searchable_terms = key_terms | path_terms
-            
-            intersection = query_terms & searchable_terms
-            
-            if intersection:
-                base_score = len(intersection)
-                bonus_score = 0
-                
-                for category, terms in priority_terms.items():
-                    if query_terms & terms['high']:
-                        if category == 'contract' and 'thirdweb' in key_terms:
-                            bonus_score += 3
-                        bonus_score += 2
-                    if query_terms & terms['medium']:
-                        bonus_score += 1
-                    if query_terms & terms['low']:
-                        bonus_score += 0.5
-                
-                if any(term in doc.url.lower() for term in query_terms):
-                    bonus_score += 1
-                    
-                final_score = base_score + bonus_score
-                scored_docs.append((final_score, doc))
+        for key in candidates:
+            entry = self.indexed_docs[key]
+            base_score = len(query_terms & entry.terms)
+            bonus_score = query_bonus
+            if contract_high and entry.is_thirdweb:
+                bonus_score += 3
+            if any(term in entry.url_lower for term in query_terms):
+                bonus_score += 1
+            scored_docs.append((base_score + bonus_score, -entry.order, entry.doc))
         
-        scored_docs.sort(reverse=True, key=lambda x: x[0])
-        return [doc for _, doc in scored_docs[:max_results]]
+        best = heapq.nlargest(max_results, scored_docs, key=lambda x: (x[0], x[1]))
+        return [doc for _, _, doc in best]
 
     def get_url(self, key: str) -> str:
         """Get URL by key"""
@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import tiktoken
+from langchain.schema import Document
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an exception is an HTTP 429 from the embeddings API"""
+    if type(error).__name__ == 'RateLimitError':
+        return True
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    return '429' in str(error) and 'rate' in str(error).lower()
+
+
+class AdaptiveLimit:
+    def __init__(self, limit: int):
+        """
+        Concurrency limit that halves on rate limiting and grows back on success
+        :param limit: Maximum concurrency
+        """
+        self.max_limit = max(1, limit)
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, rate_limited: bool = False):
+        with self._condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self.limit < self.max_limit and self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+class EmbeddingBatcher:
+    def __init__(self, max_tokens_per_batch: int = 50000, max_items_per_batch: int = 500,
+                 concurrency: int = 4, max_retries: int = 6, encoding_name: str = "cl100k_base"):
+        """
+        Packs chunks into token-bounded batches and embeds several batches at once
+        :param max_tokens_per_batch: Token budget of one embeddings request
+        :param max_items_per_batch: Maximum chunks in one request
+        :param concurrency: Embedding requests kept in flight
+        :param max_retries: Retries of a batch after rate limiting
+        :param encoding_name: Tokenizer used by the embedding model
+        """
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_items_per_batch = max_items_per_batch
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.encoding = tiktoken.get_encoding(encoding_name)
+
+    def pack(self, documents: List[Document], ids: List[str]) -> List[Tuple[List[Document], List[str], int]]:
+        """Groups documents into batches bounded by token count and item count"""
+        batches = []
+        current_docs, current_ids, current_tokens = [], [], 0
+        for doc, doc_id in zip(documents, ids):
+            tokens = len(self.encoding.encode(doc.page_content, disallowed_special=()))
+            if current_docs and (current_tokens + tokens > self.max_tokens_per_batch
+                                 or len(current_docs) >= self.max_items_per_batch):
+                batches.append((current_docs, current_ids, current_tokens))
+                current_docs, current_ids, current_tokens = [], [], 0
+            current_docs.append(doc)
+            current_ids.append(doc_id)
+            current_tokens += tokens
+        if current_docs:
+            batches.append((current_docs, current_ids, current_tokens))
+        return batches
+
+    def run(self, documents: List[Document], ids: List[str],
+            embed_fn: Callable[[List[str]], List[List[float]]],
+            write_fn: Callable[[List[Document], List[str], List[List[float]]], None]) -> Dict[str, float]:
+        """
+        Embeds batches concurrently, then hands each one to write_fn
+        :param documents: Chunks to embed
+        :param ids: Chunk IDs, parallel to documents
+        :param embed_fn: Embeds a list of texts; retried on rate limiting
+        :param write_fn: Stores a batch with its vectors once embedded; calls are serialized
+        :return: Throughput statistics
+        """
+        batches = self.pack(documents, ids)
+        limit = AdaptiveLimit(self.concurrency)
+        write_lock = threading.Lock()
+        stats = {'chunks': 0, 'tokens': 0, 'batches': len(batches), 'rate_limited': 0}
+        stats_lock = threading.Lock()
+        started = time.perf_counter()
+
+        def process(batch: Tuple[List[Document], List[str], int]):
+            batch_docs, batch_ids, batch_tokens = batch
+            texts = [doc.page_content for doc in batch_docs]
+            for attempt in range(self.max_retries + 1):
+                limit.acquire()
+                try:
+                    vectors = embed_fn(texts)
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt == self.max_retries:
+                        limit.release()
+                        raise
+                    limit.release(rate_limited=True)
+                    with stats_lock:
+                        stats['rate_limited'] += 1
+                    time.sleep(min(60, 2 ** attempt) + random.uniform(0, 1))
+                    continue
+                limit.release()
+                break
+
+            with write_lock:
+                write_fn(batch_docs, batch_ids, vectors)
+            with stats_lock:
+                stats['chunks'] += len(batch_docs)
+                stats['tokens'] += batch_tokens
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for future in [executor.submit(process, batch) for batch in batches]:
+                future.result()
+
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = elapsed
+        stats['chunks_per_second'] = stats['chunks'] / elapsed if elapsed else 0.0
+        stats['tokens_per_second'] = stats['tokens'] / elapsed if elapsed else 0.0
+        return stats
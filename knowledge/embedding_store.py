@@ -0,0 +1,109 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, List
+
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingStore:
+    def __init__(self, path: str = "./cache/embeddings.sqlite3"):
+        """
+        On-disk, content-addressed store of embedding vectors
+        :param path: SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """SHA-256 of the model name and the exact chunk text"""
+        digest = hashlib.sha256()
+        digest.update(model.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Returns the stored vectors for the keys that are present"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                )
+                for key, blob in rows:
+                    found[key] = array('f', blob).tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Stores vectors, replacing any existing entry for the same key"""
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array('f', vector).tobytes()) for key, vector in items.items()]
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, model: str, store: EmbeddingStore):
+        """
+        Embeddings wrapper that only calls the API for texts not seen before
+        :param embeddings: Underlying embeddings client
+        :param model: Model name, part of the cache key
+        :param store: Persistent vector store
+        """
+        self.embeddings = embeddings
+        self.model = model
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingStore.make_key(self.model, text) for text in texts]
+        cached = self.store.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.store.put_many(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns how many chunk embeddings were reused or computed"""
+        return {'reused': self.hits, 'computed': self.misses}
@@ -0,0 +1,109 @@
+import os
+import shutil
+import time
+from typing import List, Optional
+
+CURRENT_FILE = "CURRENT"
+GENERATIONS_DIR = "generations"
+# Files that describe the knowledge base as a whole rather than one generation
+SHARED_FILES = (CURRENT_FILE, GENERATIONS_DIR, ".training_hashes.json", ".processed_files.json")
+
+class GenerationStore:
+    def __init__(self, root: str = "./knowledge_base", keep: int = 3, grace_seconds: float = 600):
+        """
+        Versioned knowledge base directories behind an atomically updated pointer
+        :param root: Knowledge base directory holding the CURRENT pointer and the generations
+        :param keep: Published generations kept on disk, so readers of an older one can finish
+        :param grace_seconds: Generations modified more recently than this are never pruned
+        """
+        self.root = root
+        self.keep = max(1, keep)
+        self.grace_seconds = grace_seconds
+        self.generations_dir = os.path.join(root, GENERATIONS_DIR)
+        self.pointer_path = os.path.join(root, CURRENT_FILE)
+
+    def current(self) -> Optional[str]:
+        """ID of the published generation, or None if the knowledge base predates generations"""
+        try:
+            with open(self.pointer_path, 'r') as f:
+                generation = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if generation and os.path.isdir(self.path(generation)):
+            return generation
+        return None
+
+    def path(self, generation: Optional[str]) -> str:
+        """Directory of a generation; the root itself holds a pre-generation knowledge base"""
+        if generation is None:
+            return self.root
+        return os.path.join(self.generations_dir, generation)
+
+    def current_path(self) -> str:
+        return self.path(self.current())
+
+    def create(self, copy_current: bool = True) -> str:
+        """
+        Create an unpublished generation to build into
+        :param copy_current: Start from a copy of the published generation (incremental update)
+                             instead of an empty directory (full rebuild)
+        :return: The new generation ID
+        """
+        os.makedirs(self.generations_dir, exist_ok=True)
+        existing = self.list()
+        # Zero-padded nanoseconds sort in creation order, even within the same second
+        sequence = max(time.time_ns(), int(existing[-1]) + 1 if existing else 0)
+        while True:
+            generation = f"{sequence:020d}"
+            try:
+                os.makedirs(self.path(generation))
+                break
+            except FileExistsError:
+                sequence += 1
+        
+        source = self.current_path()
+        if copy_current and os.path.isdir(source):
+            shutil.copytree(source, self.path(generation), ignore=shutil.ignore_patterns(*SHARED_FILES),
+                            dirs_exist_ok=True)
+        return generation
+
+    def publish(self, generation: str):
+        """Point readers at a generation, then prune the oldest ones"""
+        tmp_path = f"{self.pointer_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(generation)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+        self.prune()
+
+    def discard(self, generation: str):
+        """Delete an unpublished generation"""
+        if generation != self.current():
+            shutil.rmtree(self.path(generation), ignore_errors=True)
+
+    def list(self) -> List[str]:
+        """Generation IDs, oldest first"""
+        if not os.path.isdir(self.generations_dir):
+            return []
+        return sorted(name for name in os.listdir(self.generations_dir)
+                      if name.isdigit() and os.path.isdir(os.path.join(self.generations_dir, name)))
+
+    def prune(self):
+        """
+        Remove published generations older than the last `keep` ones.
+        The current generation, newer ones and recently modified ones are never removed.
+        """
+        current = self.current()
+        if current is None:
+            return
+        generations = self.list()
+        older = generations[:generations.index(current)]
+        cutoff = time.time() - self.grace_seconds
+        for generation in older[:max(0, len(older) - (self.keep - 1))]:
+            try:
+                if os.path.getmtime(self.path(generation)) > cutoff:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(self.path(generation), ignore_errors=True)
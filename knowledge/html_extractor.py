@@ -0,0 +1,107 @@
+import re
+from typing import Iterable, Iterator
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+REMOVED_TAGS = ('script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript', 'svg')
+BLOCK_TAGS = {
+    'address', 'article', 'blockquote', 'br', 'dd', 'details', 'div', 'dl', 'dt', 'figcaption',
+    'figure', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main', 'ol', 'p', 'pre',
+    'section', 'summary', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul'
+}
+MAIN_CONTENT_XPATHS = (
+    '//main',
+    '//article',
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' content ')]"
+)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def _iter_lxml_blocks(html: str) -> Iterator[str]:
+    # Decode as UTF-8 explicitly so pages with an XML encoding declaration still parse
+    parser = lxml.html.HTMLParser(encoding='utf-8')
+    root = lxml.html.document_fromstring(html.encode('utf-8'), parser=parser)
+    etree.strip_elements(root, *REMOVED_TAGS, with_tail=False)
+
+    container = root
+    for xpath in MAIN_CONTENT_XPATHS:
+        matches = root.xpath(xpath)
+        if matches:
+            container = matches[0]
+            break
+
+    buffer = []
+
+    def flush():
+        text = WHITESPACE_PATTERN.sub(' ', ''.join(buffer)).strip()
+        buffer.clear()
+        return text
+
+    for event, element in etree.iterwalk(container, events=('start', 'end')):
+        is_block = isinstance(element.tag, str) and element.tag in BLOCK_TAGS
+        if event == 'start':
+            if is_block:
+                text = flush()
+                if text:
+                    yield text
+            if isinstance(element.tag, str) and element.text:
+                buffer.append(element.text)
+        else:
+            if is_block:
+                text = flush()
+                if text:
+                    yield text
+            if element is not container and element.tail:
+                buffer.append(element.tail)
+
+    text = flush()
+    if text:
+        yield text
+
+
+def _iter_soup_blocks(html: str) -> Iterator[str]:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup.find_all(list(REMOVED_TAGS)):
+        element.decompose()
+
+    main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
+    for line in (main_content or soup).get_text(separator='\n', strip=True).splitlines():
+        if line.strip():
+            yield line.strip()
+
+
+def iter_text_blocks(html: str) -> Iterator[str]:
+    """Yield the text of each block element in the page's main content"""
+    if HAS_LXML:
+        return _iter_lxml_blocks(html)
+    return _iter_soup_blocks(html)
+
+
+def iter_chunks(blocks: Iterable[str], text_splitter, window: int) -> Iterator[str]:
+    """
+    Split a stream of text blocks without joining the whole page first
+    :param blocks: Text blocks in document order
+    :param text_splitter: Splitter with a split_text method
+    :param window: Characters buffered before splitting
+    """
+    buffer = []
+    size = 0
+    for block in blocks:
+        buffer.append(block)
+        size += len(block) + 1
+        if size >= window:
+            chunks = text_splitter.split_text('\n'.join(buffer))
+            # The last chunk may continue in the next blocks, so carry it over
+            yield from chunks[:-1]
+            buffer = [chunks[-1]] if chunks else []
+            size = sum(len(part) + 1 for part in buffer)
+
+    if buffer:
+        yield from text_splitter.split_text('\n'.join(buffer))
@@ -0,0 +1,162 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+PROCESSED = 'processed'
+FAILED = 'failed'
+
+class IngestionManifest:
+    def __init__(self, path: str = "./cache/ingestion_manifest.sqlite3"):
+        """
+        Registry of ingested files and videos shared by the builder and the frontend
+        :param path: SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS items (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    hash TEXT,
+                    status TEXT NOT NULL,
+                    added_date TEXT NOT NULL,
+                    last_processed TEXT,
+                    last_modified REAL,
+                    error TEXT,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_items_status ON items (kind, status)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    def register(self, kind: str, key: str, file_hash: Optional[str] = None,
+                 last_modified: Optional[float] = None, status: str = PENDING,
+                 last_processed: Optional[str] = None, error: Optional[str] = None):
+        """Adds an item, or updates its hash and status while keeping the added date"""
+        self._execute("""
+            INSERT INTO items (kind, key, hash, status, added_date, last_processed, last_modified, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (kind, key) DO UPDATE SET
+                hash = COALESCE(excluded.hash, items.hash),
+                status = excluded.status,
+                last_processed = COALESCE(excluded.last_processed, items.last_processed),
+                last_modified = COALESCE(excluded.last_modified, items.last_modified),
+                error = excluded.error
+        """, (kind, key, file_hash, status, datetime.now().isoformat(), last_processed, last_modified, error))
+
+    def set_status(self, kind: str, key: str, status: str, error: Optional[str] = None):
+        """Updates the status of an item, registering it if needed"""
+        self.register(kind, key, status=status, error=error)
+
+    def mark_processed(self, kind: str, key: str, file_hash: Optional[str] = None):
+        """Records that an item was ingested successfully"""
+        self.register(kind, key, file_hash=file_hash, status=PROCESSED,
+                      last_processed=datetime.now().isoformat())
+
+    def mark_failed(self, kind: str, key: str, error: str):
+        """Records that an item failed to ingest"""
+        self.set_status(kind, key, FAILED, error=error)
+
+    def remove(self, kind: str, key: str):
+        self._execute("DELETE FROM items WHERE kind = ? AND key = ?", (kind, key))
+
+    def get(self, kind: str, key: str) -> Optional[Dict]:
+        rows = self._execute("SELECT * FROM items WHERE kind = ? AND key = ?", (kind, key))
+        return dict(rows[0]) if rows else None
+
+    def hashes(self, kind: str, status: str = PROCESSED) -> Dict[str, str]:
+        """Hashes of the items of a kind with the given status"""
+        rows = self._execute("SELECT key, hash FROM items WHERE kind = ? AND status = ?", (kind, status))
+        return {row['key']: row['hash'] for row in rows}
+
+    def keys(self, kind: str, status: Optional[str] = None) -> Set[str]:
+        if status:
+            rows = self._execute("SELECT key FROM items WHERE kind = ? AND status = ?", (kind, status))
+        else:
+            rows = self._execute("SELECT key FROM items WHERE kind = ?", (kind,))
+        return {row['key'] for row in rows}
+
+    def list(self, kind: Optional[str] = None, status: Optional[str] = None) -> List[Dict]:
+        """Items filtered by kind and status, newest first"""
+        sql = "SELECT * FROM items WHERE 1 = 1"
+        params = []
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY added_date DESC"
+        return [dict(row) for row in self._execute(sql, tuple(params))]
+
+    def import_legacy(self, builder_registry: str, frontend_registry: str):
+        """One-time import of the old .processed_files.json registries"""
+        if self._execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'"):
+            return
+
+        def read(path):
+            if not os.path.exists(path):
+                return {}
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Warning: Could not import {path}: {str(e)}")
+                return {}
+
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            for filename, info in read(frontend_registry).items():
+                if not isinstance(info, dict):
+                    continue
+                self._conn.execute("""
+                    INSERT OR IGNORE INTO items (kind, key, status, added_date, last_processed, last_modified)
+                    VALUES ('pdf', ?, ?, ?, ?, ?)
+                """, (filename, PROCESSED if info.get('processed') else PENDING,
+                      info.get('added_date', now), info.get('last_processed'), info.get('last_modified')))
+
+            builder = read(builder_registry)
+            pdfs = dict(builder.get('pdfs', {}))
+            pdfs.update({k: v for k, v in builder.items() if k.endswith('.pdf') and isinstance(v, dict)})
+            for filename, info in pdfs.items():
+                self._conn.execute("""
+                    INSERT INTO items (kind, key, hash, status, added_date, last_processed)
+                    VALUES ('pdf', ?, ?, ?, ?, ?)
+                    ON CONFLICT (kind, key) DO UPDATE SET
+                        hash = excluded.hash, status = excluded.status, last_processed = excluded.last_processed
+                """, (filename, info.get('hash'), PROCESSED, now, info.get('last_processed')))
+
+            for url in builder.get('youtube_urls', []):
+                self._conn.execute("""
+                    INSERT OR IGNORE INTO items (kind, key, status, added_date) VALUES ('youtube', ?, ?, ?)
+                """, (url, PROCESSED, now))
+
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (now,))
+
+_manifest: Optional[IngestionManifest] = None
+_manifest_lock = threading.Lock()
+
+def get_manifest() -> IngestionManifest:
+    """Process-wide manifest, importing the legacy JSON registries on first use"""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = IngestionManifest(os.getenv('INGESTION_MANIFEST_PATH', './cache/ingestion_manifest.sqlite3'))
+            _manifest.import_legacy('./knowledge_base/.processed_files.json', './docs/.processed_files.json')
+        return _manifest
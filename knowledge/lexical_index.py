@@ -0,0 +1,136 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from langchain.schema import Document
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'for', 'from', 'how', 'i',
+    'in', 'is', 'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'what', 'which', 'with',
+    'you', 'your', 'my', 'me'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric terms, keeping identifiers like erc1155 intact"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """Merges several ranked ID lists into one, best first"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class BM25Index:
+    def __init__(self, path: str = None, k1: float = 1.5, b: float = 0.75):
+        """
+        Inverted index with BM25 scoring over knowledge base chunks
+        :param path: JSON file the index is persisted to
+        :param k1: Term frequency saturation
+        :param b: Document length normalization
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.docs: Dict[str, Dict] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Loads an index from disk, or returns an empty one if there is none"""
+        index = cls(path)
+        if not os.path.exists(path):
+            return index
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for doc_id, doc in data.get('docs', {}).items():
+                index._insert(doc_id, doc['text'], doc['metadata'], doc['terms'])
+        except Exception as e:
+            print(f"Warning: Could not load lexical index {path}: {str(e)}")
+        return index
+
+    def save(self):
+        """Writes the index to disk atomically"""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            data = {'docs': self.docs}
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _insert(self, doc_id: str, text: str, metadata: Dict, terms: Dict[str, int]):
+        if doc_id in self.docs:
+            self._delete(doc_id)
+        length = sum(terms.values())
+        self.docs[doc_id] = {'text': text, 'metadata': metadata, 'terms': terms, 'length': length}
+        self.total_length += length
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+
+    def _delete(self, doc_id: str):
+        doc = self.docs.pop(doc_id, None)
+        if not doc:
+            return
+        self.total_length -= doc['length']
+        for term in doc['terms']:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def add_documents(self, ids: List[str], documents: List[Document]):
+        """Adds or replaces chunks in the index"""
+        with self._lock:
+            for doc_id, doc in zip(ids, documents):
+                terms = dict(Counter(tokenize(doc.page_content)))
+                self._insert(doc_id, doc.page_content, dict(doc.metadata or {}), terms)
+
+    def delete(self, ids: List[str]):
+        """Removes chunks from the index"""
+        with self._lock:
+            for doc_id in ids:
+                self._delete(doc_id)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Returns the k best (id, score) pairs for the query"""
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self.docs)
+            if not n_docs or not terms:
+                return []
+            avg_length = self.total_length / n_docs
+            scores: Dict[str, float] = {}
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, frequency in posting.items():
+                    length = self.docs[doc_id]['length']
+                    denominator = frequency + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / denominator
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def get_document(self, doc_id: str) -> Document:
+        """Returns the stored chunk as a Document"""
+        doc = self.docs[doc_id]
+        return Document(page_content=doc['text'], metadata=doc['metadata'], id=doc_id)
+
+    def __len__(self) -> int:
+        return len(self.docs)
@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from pypdf import PdfReader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+MIN_CHUNK_LENGTH = 50
+
+class ChunkRecord(NamedTuple):
+    text: str
+    source: str
+    page: int
+
+_splitters = {}
+
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """One splitter per worker process and configuration"""
+    key = (chunk_size, chunk_overlap)
+    if key not in _splitters:
+        _splitters[key] = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=["\n\n", "\n", ". ", " ", ""]
+        )
+    return _splitters[key]
+
+def _parse_range(task: Tuple[str, int, int, int, int]) -> List[ChunkRecord]:
+    """Parse and chunk pages [start, end) of a PDF"""
+    pdf_path, start, end, chunk_size, chunk_overlap = task
+    splitter = _get_splitter(chunk_size, chunk_overlap)
+    source = os.path.basename(pdf_path)
+    reader = PdfReader(pdf_path)
+    records = []
+    for page_number in range(start, end):
+        text = reader.pages[page_number].extract_text() or ""
+        for chunk in splitter.split_text(text):
+            if len(chunk.strip()) > MIN_CHUNK_LENGTH:
+                records.append(ChunkRecord(chunk, source, page_number))
+    return records
+
+def _plan_tasks(pdf_paths: List[str], chunk_size: int, chunk_overlap: int,
+                pages_per_task: int, errors: Dict[str, str]) -> List[Tuple[str, int, int, int, int]]:
+    tasks = []
+    for pdf_path in pdf_paths:
+        try:
+            page_count = len(PdfReader(pdf_path).pages)
+        except Exception as e:
+            print(f"Error reading PDF {pdf_path}: {str(e)}")
+            errors[pdf_path] = str(e)
+            continue
+        for start in range(0, page_count, pages_per_task):
+            tasks.append((pdf_path, start, min(start + pages_per_task, page_count), chunk_size, chunk_overlap))
+    return tasks
+
+def parse_pdfs(pdf_paths: List[str], chunk_size: int, chunk_overlap: int,
+               max_workers: Optional[int] = None, pages_per_task: int = 25,
+               errors: Optional[Dict[str, str]] = None,
+               progress: Optional[Callable[[int, int], None]] = None) -> List[ChunkRecord]:
+    """
+    Parse and chunk PDFs, fanning page ranges out to a process pool
+    :param pdf_paths: PDF files to parse
+    :param chunk_size: Splitter chunk size
+    :param chunk_overlap: Splitter chunk overlap
+    :param max_workers: Worker processes (defaults to the CPU count)
+    :param pages_per_task: Pages handled by one task, so large PDFs are split across workers
+    :param errors: Filled with the first error of each PDF that could not be fully parsed
+    :param progress: Called with (PDFs done, total PDFs) as each PDF finishes
+    :return: Chunk records in file and page order
+    """
+    errors = {} if errors is None else errors
+    tasks = _plan_tasks(pdf_paths, chunk_size, chunk_overlap, pages_per_task, errors)
+    remaining = {}
+    for task in tasks:
+        remaining[task[0]] = remaining.get(task[0], 0) + 1
+    total = len(pdf_paths)
+    done = total - len(remaining)
+    if progress and done:
+        progress(done, total)
+    if not tasks:
+        return []
+
+    results: List[List[ChunkRecord]] = [[] for _ in tasks]
+
+    def task_finished(index: int, error: Optional[Exception] = None):
+        nonlocal done
+        pdf_path, start, end = tasks[index][:3]
+        if error is not None:
+            print(f"Error processing PDF {pdf_path} pages {start}-{end}: {str(error)}")
+            errors.setdefault(pdf_path, str(error))
+        remaining[pdf_path] -= 1
+        if not remaining[pdf_path]:
+            done += 1
+            if progress:
+                progress(done, total)
+
+    # Exceptions from the progress callback (e.g. a cancellation) propagate and stop the parse
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers == 1:
+        for index, task in enumerate(tasks):
+            error = None
+            try:
+                results[index] = _parse_range(task)
+            except Exception as e:
+                error = e
+            task_finished(index, error)
+    else:
+        # Spawned workers, since forking a multithreaded process (the admin frontend) can deadlock them
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {executor.submit(_parse_range, task): index for index, task in enumerate(tasks)}
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    error = None
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        error = e
+                    task_finished(index, error)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    return [record for task_records in results for record in task_records]
@@ -0,0 +1,86 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+MENTION_PATTERN = re.compile(r'@\w+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+TRAILING_PUNCTUATION = '?!.,;:¿¡…。 '
+EMOJI_COMPONENTS = {'\u200d', '\ufe0e', '\ufe0f', '\u20e3'}
+
+class QueryNormalizer:
+    def __init__(self, history_size: int = 10000):
+        """
+        Canonicalizes user queries before they are used as cache keys
+        :param history_size: Number of recent queries tracked for hit-rate statistics
+        """
+        self.history_size = history_size
+        self._raw_seen = OrderedDict()
+        self._canonical_seen = OrderedDict()
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.changed = 0
+        self.raw_repeats = 0
+        self.canonical_repeats = 0
+
+    @staticmethod
+    def _is_emoji(char: str) -> bool:
+        if char in EMOJI_COMPONENTS:
+            return True
+        if 0x1F3FB <= ord(char) <= 0x1F3FF:
+            return True
+        return unicodedata.category(char) == 'So'
+
+    def canonicalize(self, text: str, bot_username: Optional[str] = None) -> str:
+        """
+        Returns the canonical form of a query
+        :param text: Raw message text
+        :param bot_username: Bot username whose mentions are removed
+        :return: Normalized query, or the stripped raw text if nothing is left
+        """
+        lines = [line for line in text.splitlines() if not line.lstrip().startswith('>')]
+        normalized = "\n".join(lines)
+
+        if bot_username:
+            normalized = re.sub(rf'@{re.escape(bot_username)}\b', ' ', normalized, flags=re.IGNORECASE)
+        normalized = MENTION_PATTERN.sub(lambda m: ' ' if m.group(0).lower().endswith('bot') else m.group(0), normalized)
+
+        normalized = unicodedata.normalize('NFKC', normalized)
+        normalized = "".join(' ' if self._is_emoji(char) else char for char in normalized)
+        normalized = WHITESPACE_PATTERN.sub(' ', normalized.casefold()).strip()
+        normalized = normalized.rstrip(TRAILING_PUNCTUATION).lstrip('¿¡ ')
+
+        return normalized or text.strip()
+
+    def normalize(self, text: str, bot_username: Optional[str] = None) -> str:
+        """Canonicalizes a query and records whether normalization made it a repeat"""
+        canonical = self.canonicalize(text, bot_username)
+        with self._lock:
+            self.queries += 1
+            if canonical != text:
+                self.changed += 1
+            if self._touch(self._raw_seen, text):
+                self.raw_repeats += 1
+            if self._touch(self._canonical_seen, canonical):
+                self.canonical_repeats += 1
+        return canonical
+
+    def _touch(self, seen: OrderedDict, key: str) -> bool:
+        present = key in seen
+        seen[key] = True
+        seen.move_to_end(key)
+        while len(seen) > self.history_size:
+            seen.popitem(last=False)
+        return present
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns how often normalization turned a new query into a repeat"""
+        queries = self.queries or 1
+        return {
+            'queries': self.queries,
+            'changed': self.changed,
+            'raw_repeat_rate': self.raw_repeats / queries,
+            'canonical_repeat_rate': self.canonical_repeats / queries,
+            'extra_repeats': self.canonical_repeats - self.raw_repeats
+        }
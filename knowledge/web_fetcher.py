@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+@dataclass
+class FetchResult:
+    url: str
+    status: str
+    text: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+class WebFetcher:
+    def __init__(self, cache_path: str, max_workers: int = 8, per_host: int = 4, timeout: float = 15.0):
+        """
+        Concurrent page fetcher with conditional GETs
+        :param cache_path: JSON file holding ETag/Last-Modified validators per URL
+        :param max_workers: Total requests in flight
+        :param per_host: Requests in flight per host
+        :param timeout: Per-request timeout in seconds
+        """
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.validators: Dict[str, Dict[str, str]] = self._load_validators()
+        self._pending: Dict[str, Dict[str, str]] = {}
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'DexFren-KnowledgeBase/1.0'
+
+    def set_cache_path(self, cache_path: str):
+        """Switches to the validators stored with another knowledge base directory"""
+        with self._lock:
+            self.cache_path = cache_path
+            self.validators = self._load_validators()
+            self._pending = {}
+
+    def _load_validators(self) -> Dict[str, Dict[str, str]]:
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load HTTP cache {self.cache_path}: {str(e)}")
+            return {}
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def fetch(self, url: str) -> FetchResult:
+        """Fetches one URL, sending stored validators so unchanged pages return 304"""
+        headers = {}
+        cached = self.validators.get(url, {})
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        started = time.monotonic()
+        try:
+            with self._host_limit(url):
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            elapsed = time.monotonic() - started
+            if response.status_code == 304:
+                return FetchResult(url=url, status='not_modified', elapsed=elapsed)
+            response.raise_for_status()
+            return FetchResult(
+                url=url,
+                status='ok',
+                text=response.text,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                elapsed=elapsed
+            )
+        except Exception as e:
+            return FetchResult(url=url, status='error', error=str(e), elapsed=time.monotonic() - started)
+
+    def fetch_all(self, urls: List[str]) -> Dict[str, FetchResult]:
+        """Fetches URLs concurrently, returning results keyed by URL"""
+        unique_urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.fetch, unique_urls))
+        return {result.url: result for result in results}
+
+    def stage(self, result: FetchResult):
+        """Records a page's validators, to be saved once its content is indexed"""
+        if result.status == 'ok' and (result.etag or result.last_modified):
+            self._pending[result.url] = {
+                'etag': result.etag,
+                'last_modified': result.last_modified
+            }
+
+    def commit(self):
+        """Saves the validators of pages that were indexed successfully"""
+        if not self._pending:
+            return
+        self.validators.update(self._pending)
+        self._pending = {}
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.validators, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
@@ -1,37 +1,78 @@
+import time
+_process_started = time.perf_counter()
+
 from dotenv import load_dotenv
 import os
 import logging
 import asyncio
+import importlib
+import threading
+from contextlib import asynccontextmanager
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from swarm import Swarm, Agent
-from knowledge.data_ingestion import DexKitKnowledgeBase
-from langchain_community.vectorstores import Chroma
-from chromadb.config import Settings
+from knowledge.answer_cache import SemanticAnswerCache
+from knowledge.chunk_ids import chunk_key
+from knowledge.query_normalizer import QueryNormalizer
 import sys
 from typing import Optional
 import json
 from utils.logger import setup_logger
+from utils.completion_pool import CompletionPool
+from utils.telegram_streaming import StreamingReply, send_reply
+from utils.conversation_store import ConversationStore
+from utils.prompt_builder import PromptBuilder
 
 load_dotenv()
 logger = setup_logger()
 
-client = Swarm()
-knowledge_base = DexKitKnowledgeBase()
+MAX_CONCURRENT_COMPLETIONS = int(os.getenv('MAX_CONCURRENT_COMPLETIONS', '8'))
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '64'))
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', '1') == '1'
+STREAM_EDIT_INTERVAL_PRIVATE = float(os.getenv('STREAM_EDIT_INTERVAL_PRIVATE', '1.0'))
+STREAM_EDIT_INTERVAL_GROUP = float(os.getenv('STREAM_EDIT_INTERVAL_GROUP', '3.0'))
+ANSWER_CACHE_THRESHOLD = float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.95'))
+ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', '86400'))
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '500'))
+CONVERSATION_HISTORY_SIZE = int(os.getenv('CONVERSATION_HISTORY_SIZE', '20'))
+CONVERSATION_CONTEXT_MESSAGES = int(os.getenv('CONVERSATION_CONTEXT_MESSAGES', '6'))
+CONVERSATION_IDLE_TTL = int(os.getenv('CONVERSATION_IDLE_TTL', '86400'))
+CONVERSATION_MAX_BYTES = int(os.getenv('CONVERSATION_MAX_BYTES', str(50 * 1024 * 1024)))
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '6000'))
+GENERATION_CHECK_INTERVAL = float(os.getenv('GENERATION_CHECK_INTERVAL', '30'))
+BACKGROUND_WARMUP = os.getenv('BACKGROUND_WARMUP', '1') == '1'
+TELEGRAM_WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL')
+# Only plain messages reach the handlers (text and /start), so nothing else is requested
+ALLOWED_UPDATES = [Update.MESSAGE]
+READINESS_TIMEOUT = float(os.getenv('READINESS_TIMEOUT', '120'))
 
-knowledge_base.db = Chroma(
-    persist_directory="./knowledge_base",
-    embedding_function=knowledge_base.embeddings,
-    client_settings=Settings(
-        anonymized_telemetry=False,
-        allow_reset=True,
-        is_persistent=True
-    )
-)
+startup_timings = {'imports': time.perf_counter() - _process_started}
+ready = threading.Event()
+startup_error: Optional[BaseException] = None
 
-knowledge_base.cache.set_query_function(knowledge_base._raw_query_knowledge)
+# Built by warm_up(), which imports langchain, chromadb and swarm off the critical path
+client = None
+dexkit_agent = None
+knowledge_base = None
+prompt_builder = None
 
-active_conversations = {}
+completion_pool = CompletionPool(max_concurrent=MAX_CONCURRENT_COMPLETIONS)
+query_normalizer = QueryNormalizer()
+answer_cache = SemanticAnswerCache(
+    similarity_threshold=ANSWER_CACHE_THRESHOLD,
+    ttl=ANSWER_CACHE_TTL,
+    max_entries=ANSWER_CACHE_SIZE
+)
+conversation_store = ConversationStore(
+    history_size=CONVERSATION_HISTORY_SIZE,
+    idle_ttl=CONVERSATION_IDLE_TTL,
+    max_bytes=CONVERSATION_MAX_BYTES,
+    db_path=os.getenv('CONVERSATION_DB_PATH') or None
+)
 
 def load_agent_config():
     """Load agent configuration from JSON file"""
@@ -95,11 +136,68 @@ def format_agent_instructions(config):
     return "\n".join(sections)
 
 agent_config = load_agent_config()
-dexkit_agent = Agent(
-    name=agent_config['name'],
-    instructions=agent_config['instructions'],
-    model=agent_config['model']
-)
+startup_timings['config'] = time.perf_counter() - _process_started - startup_timings['imports']
+
+def _timed(step: str, func, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        startup_timings[step] = time.perf_counter() - started
+
+def _warm(step: str, func, *args, **kwargs):
+    """Best-effort warmup call; a failure only costs the first user some latency"""
+    try:
+        _timed(step, func, *args, **kwargs)
+    except Exception as e:
+        logger.warning(f"Warmup step {step} failed: {str(e)}")
+
+def warm_up():
+    """Import and open everything a query needs, then prime the index and the API connections"""
+    global client, dexkit_agent, knowledge_base, prompt_builder, startup_error
+    try:
+        swarm = _timed('import_swarm', importlib.import_module, 'swarm')
+        data_ingestion = _timed('import_knowledge', importlib.import_module, 'knowledge.data_ingestion')
+        
+        kb = _timed('open_knowledge_base', data_ingestion.DexKitKnowledgeBase)
+        _timed('load_index', kb.load_knowledge_base)
+        client = swarm.Swarm()
+        dexkit_agent = swarm.Agent(
+            name=agent_config['name'],
+            instructions=agent_config['instructions'],
+            model=agent_config['model']
+        )
+        prompt_builder = _timed('load_tokenizer', PromptBuilder,
+                                model=agent_config['model'], budget_tokens=PROMPT_TOKEN_BUDGET)
+        knowledge_base = kb
+        
+        embedding = None
+        try:
+            embedding = _timed('warm_embeddings', kb.embed_query, "DexAppBuilder")
+        except Exception as e:
+            logger.warning(f"Warmup step warm_embeddings failed: {str(e)}")
+        if embedding is not None:
+            _warm('warm_vector_index', kb.db.similarity_search_by_vector, embedding, k=1)
+        _warm('warm_lexical_index', kb.lexical_index.search, "DexAppBuilder", k=1)
+        _warm('warm_llm_connection', client.client.models.list)
+    except BaseException as e:
+        startup_error = e
+        logger.critical(f"Startup failed: {str(e)}")
+    finally:
+        startup_timings['total'] = time.perf_counter() - _process_started
+        ready.set()
+    
+    if startup_error is None:
+        logger.info("Ready in {:.2f}s ({})".format(
+            startup_timings['total'],
+            ", ".join(f"{step} {seconds:.2f}s" for step, seconds in startup_timings.items() if step != 'total')
+        ))
+
+async def wait_until_ready() -> bool:
+    """Waits for warm_up(); False if startup failed or took too long"""
+    if not ready.is_set():
+        await asyncio.to_thread(ready.wait, READINESS_TIMEOUT)
+    return ready.is_set() and startup_error is None
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     welcome_message = """
@@ -115,6 +213,23 @@ How can I assist you today?
     """
     await update.message.reply_text(welcome_message)
 
+_chat_turns = {}
+
+@asynccontextmanager
+async def chat_turn(chat_id: int):
+    """Serializes the handling of messages from one chat; idle chats hold no lock"""
+    turn = _chat_turns.get(chat_id)
+    if turn is None:
+        turn = _chat_turns[chat_id] = {'lock': asyncio.Lock(), 'users': 0}
+    turn['users'] += 1
+    try:
+        async with turn['lock']:
+            yield
+    finally:
+        turn['users'] -= 1
+        if not turn['users']:
+            del _chat_turns[chat_id]
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle incoming messages."""
     try:
@@ -139,62 +254,130 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             action="typing"
         )
         
-        if chat_id not in active_conversations:
-            active_conversations[chat_id] = []
-            
-        active_conversations[chat_id].append({
-            "role": "user",
-            "content": message_text
-        })
-        
-        relevant_info = knowledge_base.cache.query(message_text)
-        context_text = "\n".join([doc.page_content for doc in relevant_info])
-        
-        conversation = [
-            {"role": "system", "content": f"{dexkit_agent.instructions}\n\n{context_text}"},
-            {"role": "system", "content": "Remember to be specific and provide actionable steps."}
-        ]
-        
-        if len(active_conversations[chat_id]) > 1:
-            conversation.extend(active_conversations[chat_id][-6:])
+        if not await wait_until_ready():
+            raise RuntimeError("Knowledge base is not available")
         
-        conversation.append({
-            "role": "user",
-            "content": f"Question: {message_text}\nPlease provide a detailed and specific response."
-        })
-        
-        typing_task = asyncio.create_task(keep_typing(context.bot, chat_id))
-        
-        try:
-            response = client.run(
-                agent=dexkit_agent,
-                messages=conversation,
-                stream=False
+        # One message per chat at a time, so each turn's history ends with its own question
+        async with chat_turn(chat_id):
+            conversation_store.append(chat_id, "user", message_text)
+            
+            query_text = query_normalizer.normalize(message_text, context.bot.username)
+            relevant_info = await asyncio.to_thread(knowledge_base.cache.query, query_text)
+            query_embedding = await asyncio.to_thread(knowledge_base.embed_query, query_text)
+            log_cache_stats()
+            context_ids = [chunk_key(doc) for doc in relevant_info]
+            
+            # Follow-ups depend on the conversation, so only standalone questions use the cache
+            cached_answer = None
+            if not is_reply_to_bot:
+                cached_answer = answer_cache.lookup(query_embedding, context_ids)
+            
+            if cached_answer:
+                conversation_store.append(chat_id, "assistant", cached_answer)
+                cache_info = answer_cache.info()
+                logger.info(
+                    f"Answer cache hit for {update.effective_user.username} "
+                    f"(hits: {cache_info['hits']}, misses: {cache_info['misses']})"
+                )
+                await send_reply(update.message, cached_answer)
+                return
+            
+            # The current message is sent as the question, so history stops just before it
+            history = conversation_store.recent(chat_id, CONVERSATION_CONTEXT_MESSAGES + 1)[:-1]
+            conversation, prompt_stats = prompt_builder.build(
+                instructions=dexkit_agent.instructions,
+                context_chunks=[doc.page_content for doc in relevant_info],
+                history=history,
+                question=f"Question: {message_text}\nPlease provide a detailed and specific response.",
+                reminder="Remember to be specific and provide actionable steps."
+            )
+            logger.info(
+                f"Prompt: {prompt_stats['tokens']}/{prompt_stats['budget']} tokens, "
+                f"{prompt_stats['context_chunks']} context chunks ({prompt_stats['context_dropped']} dropped), "
+                f"{prompt_stats['history_messages']} history messages ({prompt_stats['history_dropped']} dropped)"
             )
             
-            bot_response = response.messages[-1]["content"]
-            active_conversations[chat_id].append({
-                "role": "assistant",
-                "content": bot_response
-            })
+            typing_task = asyncio.create_task(keep_typing(context.bot, chat_id))
+            
+            try:
+                pool_stats = completion_pool.stats()
+                if pool_stats['waiting']:
+                    logger.info(
+                        f"Completion queue: {pool_stats['waiting']} waiting, "
+                        f"{pool_stats['in_flight']}/{pool_stats['max_concurrent']} in flight"
+                    )
+                if STREAM_RESPONSES:
+                    bot_response = await stream_response(update, conversation, typing_task, is_private)
+                else:
+                    response = await completion_pool.run(
+                        client.run,
+                        agent=dexkit_agent,
+                        messages=conversation,
+                        stream=False
+                    )
+                    bot_response = response.messages[-1]["content"]
+            
+                conversation_store.append(chat_id, "assistant", bot_response)
+            
+            finally:
+                typing_task.cancel()
+                await asyncio.sleep(0.1)
+            
+            logger.info(f"Response to {update.effective_user.username}: {bot_response}")
+            
+            if not STREAM_RESPONSES:
+                await send_reply(update.message, bot_response)
+            
+            # Only answers that reached the user are reused
+            if not is_reply_to_bot:
+                answer_cache.store(query_embedding, context_ids, bot_response)
             
-        finally:
-            typing_task.cancel()
-            await asyncio.sleep(0.1)
-        
-        logger.info(f"Response to {update.effective_user.username}: {bot_response}")
-        
-        await update.message.reply_text(
-            bot_response,
-            reply_to_message_id=update.message.message_id,
-            parse_mode='Markdown'
-        )
-        
     except Exception as e:
         error_msg = f"Error processing message: {str(e)}"
         logger.error(error_msg)
         await update.message.reply_text("Lo siento, hubo un error procesando tu mensaje.")
 
+def log_cache_stats(every: int = 100):
+    """Periodically log how normalization and caching affect the hit rate"""
+    normalizer_stats = query_normalizer.stats()
+    if normalizer_stats['queries'] % every:
+        return
+    retrieval_stats = knowledge_base.cache.info()
+    logger.info(
+        f"Query normalization: {normalizer_stats['changed']}/{normalizer_stats['queries']} rewritten, "
+        f"repeat rate {normalizer_stats['raw_repeat_rate']:.1%} raw -> "
+        f"{normalizer_stats['canonical_repeat_rate']:.1%} normalized; "
+        f"retrieval cache hit rate {retrieval_stats['hit_rate']:.1%}"
+    )
+
+async def stream_response(update: Update, conversation: list, typing_task: asyncio.Task, is_private: bool) -> str:
+    """Stream the completion into a reply that is edited as tokens arrive"""
+    reply = StreamingReply(
+        update.message,
+        min_edit_interval=STREAM_EDIT_INTERVAL_PRIVATE if is_private else STREAM_EDIT_INTERVAL_GROUP
+    )
+    bot_response = ""
+    
+    async for chunk in completion_pool.stream(
+        client.run,
+        agent=dexkit_agent,
+        messages=conversation,
+        stream=True
+    ):
+        if 'response' in chunk:
+            messages = chunk['response'].messages
+            if messages and messages[-1].get('content'):
+                bot_response = messages[-1]['content']
+        elif chunk.get('content'):
+            if not reply.started:
+                typing_task.cancel()
+            await reply.push(chunk['content'])
+    
+    bot_response = bot_response or reply.text
+    await reply.finish(bot_response)
+    logger.info(f"Streamed response with {reply.edits} edits")
+    return bot_response
+
 async def keep_typing(bot, chat_id):
     try:
         while True:
@@ -252,17 +435,60 @@ def load_youtube_metadata():
         logging.error(f"Error loading YouTube metadata: {e}")
         return {}
 
+async def watch_generations():
+    """Swap in knowledge base generations published by the builder while the bot runs"""
+    while True:
+        await asyncio.sleep(GENERATION_CHECK_INTERVAL)
+        if knowledge_base is None:
+            continue
+        try:
+            previous = knowledge_base.generation
+            if await asyncio.to_thread(knowledge_base.refresh_generation):
+                logger.info(f"Knowledge base generation swapped: {previous} -> {knowledge_base.generation}")
+        except Exception as e:
+            logger.error(f"Error loading knowledge base generation: {str(e)}")
+
+async def post_init(application: Application):
+    application.bot_data['generation_watcher'] = asyncio.create_task(watch_generations())
+    if BACKGROUND_WARMUP:
+        loop = asyncio.get_running_loop()
+        
+        def warm_up_or_stop():
+            warm_up()
+            if startup_error is not None:
+                loop.call_soon_threadsafe(application.stop_running)
+        
+        threading.Thread(target=warm_up_or_stop, name='warmup', daemon=True).start()
+
+async def post_stop(application: Application):
+    watcher = application.bot_data.pop('generation_watcher', None)
+    if watcher:
+        watcher.cancel()
+
 async def shutdown():
     """Graceful shutdown function for the bot"""
     if 'app' in globals() and app.is_running():
         await app.shutdown()
+    completion_pool.shutdown()
     print("Bot stopped gracefully")
 
 def main():
     """Initialize and run the bot"""
     try:
         global app
-        app = Application.builder().token(os.getenv('TELEGRAM_BOT_TOKEN')).build()
+        builder = (
+            Application.builder()
+            .token(os.getenv('TELEGRAM_BOT_TOKEN'))
+            .concurrent_updates(MAX_CONCURRENT_UPDATES)
+            .post_init(post_init)
+            .post_stop(post_stop)
+        )
+        if TELEGRAM_API_BASE_URL:
+            # e.g. http://localhost:8081/bot for a local or fake Bot API server
+            builder = builder.base_url(TELEGRAM_API_BASE_URL).base_file_url(
+                TELEGRAM_API_BASE_URL.rstrip('/').removesuffix('/bot') + '/file/bot'
+            )
+        app = builder.build()
         
         if not os.getenv('TELEGRAM_BOT_TOKEN'):
             logging.error("TELEGRAM_BOT_TOKEN not found in environment variables")
@@ -274,8 +500,26 @@ def main():
             handle_message
         ))
         
-        print("Starting bot...")
-        app.run_polling(allowed_updates=Update.ALL_TYPES)
+        if not BACKGROUND_WARMUP:
+            warm_up()
+            if startup_error is not None:
+                sys.exit(1)
+        
+        if TELEGRAM_WEBHOOK_URL:
+            if not WEBHOOK_SECRET:
+                logger.warning("WEBHOOK_SECRET is not set; anyone who finds the webhook URL can post updates")
+            print(f"Starting bot with webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}...")
+            app.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                webhook_url=f"{TELEGRAM_WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=ALLOWED_UPDATES
+            )
+        else:
+            print("Starting bot...")
+            app.run_polling(allowed_updates=ALLOWED_UPDATES)
         
     except Exception as e:
         logging.error(f"Critical error: {e}")
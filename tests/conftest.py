@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from langchain.schema import Document
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    Embeddings = object
+
+
+class KeywordEmbeddings(Embeddings):
+    """Deterministic embeddings: one dimension per keyword"""
+    KEYWORDS = ("swap", "nft", "token", "wallet")
+
+    def _embed(self, text):
+        text = text.lower()
+        return [float(text.count(keyword)) + 0.01 for keyword in self.KEYWORDS]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def knowledge_base(tmp_path, monkeypatch):
+    pytest.importorskip("chromadb")
+    from knowledge.chunk_ids import make_chunk_id
+    from knowledge.data_ingestion import DexKitKnowledgeBase
+    from knowledge.lexical_index import BM25Index
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+
+    kb = DexKitKnowledgeBase()
+    kb.embeddings = KeywordEmbeddings()
+    db, _ = kb._open_directory(str(tmp_path / "store"))
+    lexical_index = BM25Index()
+
+    docs = [
+        Document(page_content="How to swap tokens on the DEX swap page", metadata={"source": "swap.pdf", "page": 0}),
+        Document(page_content="Mint an NFT collection from the wallet", metadata={"source": "nft.pdf", "page": 3}),
+        Document(page_content="Create a token with the token wizard", metadata={"source": "token.pdf", "page": 1}),
+    ]
+    ids = [make_chunk_id(doc.metadata["source"], doc.metadata["page"], doc.page_content) for doc in docs]
+    db.add_documents(docs, ids=ids)
+    lexical_index.add_documents(ids, docs)
+    kb._use_directory(str(tmp_path / "store"), db, lexical_index)
+    return kb, ids
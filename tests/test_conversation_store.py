@@ -0,0 +1,18 @@
+from utils.conversation_store import ConversationStore
+
+
+def test_ring_keeps_most_recent_messages(tmp_path):
+    store = ConversationStore(history_size=2, db_path=str(tmp_path / "history.sqlite3"))
+    for index in range(3):
+        store.append(1, "user", f"message {index}")
+
+    assert [message['content'] for message in store.recent(1, 5)] == ["message 1", "message 2"]
+
+
+def test_zero_history_size_stores_nothing(tmp_path):
+    store = ConversationStore(history_size=0, db_path=str(tmp_path / "history.sqlite3"))
+
+    store.append(1, "user", "hello")
+
+    assert store.recent(1, 5) == []
+    assert store.stats()['bytes'] == 0
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("chromadb")
+
+from chromadb.api.shared_system_client import SharedSystemClient
+
+
+def test_swapping_generations_releases_old_stores(knowledge_base):
+    kb, ids = knowledge_base
+    open_paths = lambda: {path for path in SharedSystemClient._identifier_to_system if 'generations' in path}
+
+    for _ in range(5):
+        kb.begin_generation(copy_current=False)
+        kb.publish_generation()
+        kb.refresh_generation()
+
+    assert open_paths() == {kb.persist_directory}
+
+
+def test_store_stays_open_while_a_query_reads_it(knowledge_base):
+    kb, ids = knowledge_base
+    old_path = kb.persist_directory
+
+    with kb._lease_retriever() as (db, _):
+        kb.begin_generation(copy_current=False)
+        assert old_path in SharedSystemClient._identifier_to_system
+        assert db._collection.count() == len(ids)
+
+    assert old_path not in SharedSystemClient._identifier_to_system
+    assert kb._raw_query_knowledge("swap", k=1) == []
@@ -0,0 +1,32 @@
+import os
+
+from knowledge.generations import GenerationStore
+
+
+def test_generations_created_in_the_same_second_sort_in_creation_order(tmp_path):
+    store = GenerationStore(str(tmp_path), keep=2, grace_seconds=0)
+
+    created = [store.create(copy_current=False) for _ in range(5)]
+
+    assert store.list() == created
+
+
+def test_prune_keeps_current_and_newer_generations(tmp_path):
+    store = GenerationStore(str(tmp_path), keep=1, grace_seconds=0)
+    created = [store.create(copy_current=False) for _ in range(4)]
+
+    store.publish(created[2])
+
+    assert store.list() == created[2:]
+    assert store.current() == created[2]
+
+
+def test_prune_spares_recently_modified_generations(tmp_path):
+    store = GenerationStore(str(tmp_path), keep=1, grace_seconds=600)
+    created = [store.create(copy_current=False) for _ in range(3)]
+    old = created[0]
+    os.utime(store.path(old), (0, 0))
+
+    store.publish(created[-1])
+
+    assert store.list() == created[1:]
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("chromadb")
+
+from knowledge.chunk_ids import chunk_key
+
+
+def test_chunk_found_by_both_retrievers_is_returned_once(knowledge_base):
+    kb, ids = knowledge_base
+
+    results = kb._raw_query_knowledge("swap", k=3)
+
+    keys = [chunk_key(doc) for doc in results]
+    assert len(keys) == len(set(keys))
+    assert keys[0] == ids[0]
+    assert sum(doc.page_content.startswith("How to swap") for doc in results) == 1
+
+
+def test_vector_hits_carry_store_ids(knowledge_base):
+    kb, ids = knowledge_base
+
+    hits = kb._vector_search(kb.db, kb.embed_query("nft"), 3)
+
+    assert {doc.id for doc in hits} == set(ids)
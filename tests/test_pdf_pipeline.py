@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("pypdf")
+
+from pypdf import PdfWriter
+
+from knowledge.pdf_pipeline import parse_pdfs
+
+
+def test_parse_pdfs_attributes_failures_to_their_source(tmp_path):
+    valid = tmp_path / "valid.pdf"
+    writer = PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    with open(valid, 'wb') as f:
+        writer.write(f)
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4 not really a pdf")
+
+    errors, progress = {}, []
+    records = parse_pdfs([str(valid), str(broken)], chunk_size=300, chunk_overlap=30, max_workers=1,
+                         errors=errors, progress=lambda done, total: progress.append((done, total)))
+
+    assert records == []
+    assert list(errors) == [str(broken)]
+    assert progress[-1] == (2, 2)
+
+
+class Cancelled(Exception):
+    pass
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_progress_callback_errors_stop_parsing(tmp_path, max_workers):
+    paths = []
+    for index in range(4):
+        path = tmp_path / f"doc{index}.pdf"
+        writer = PdfWriter()
+        writer.add_blank_page(width=200, height=200)
+        with open(path, 'wb') as f:
+            writer.write(f)
+        paths.append(str(path))
+
+    def cancel(done, total):
+        raise Cancelled()
+
+    errors = {}
+    with pytest.raises(Cancelled):
+        parse_pdfs(paths, chunk_size=300, chunk_overlap=30, max_workers=max_workers,
+                   errors=errors, progress=cancel)
+    assert errors == {}
@@ -0,0 +1,36 @@
+import pytest
+
+tiktoken = pytest.importorskip("tiktoken")
+
+from utils.prompt_builder import MESSAGE_OVERHEAD_TOKENS, PromptBuilder
+
+
+@pytest.fixture
+def builder():
+    try:
+        tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        pytest.skip(f"Tokenizer data unavailable: {e.__class__.__name__}")
+    return PromptBuilder(model="gpt-3.5-turbo", budget_tokens=400, min_piece_tokens=10)
+
+
+def test_instructions_are_reserved_but_not_sent(builder):
+    instructions = "You are the DexKit assistant. " * 10
+    chunks = [f"Context chunk {index} about DexAppBuilder. " * 8 for index in range(10)]
+    history = [{"role": "user", "content": f"Earlier question {index}"} for index in range(10)]
+
+    messages, stats = builder.build(instructions, chunks, history, "Question: how do I swap?", reminder="Be specific.")
+
+    assert all(instructions not in message['content'] for message in messages)
+    sent_with_instructions = (builder.count_messages(messages)
+                              + MESSAGE_OVERHEAD_TOKENS + builder.count(instructions))
+    assert stats['tokens'] == sent_with_instructions
+    assert stats['tokens'] <= stats['budget']
+    assert stats['context_dropped'] > 0
+
+
+def test_special_token_text_is_counted_as_plain_text(builder):
+    text = "What does <|endoftext|> mean?"
+
+    assert builder.count(text) > 0
+    assert builder.truncate(text, 3)
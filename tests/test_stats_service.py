@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+pytest.importorskip("flask")
+
+
+@pytest.fixture
+def stats_service_class(tmp_path, monkeypatch):
+    # Importing the app creates its working directories in the current directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from frontend.app import StatsService
+    return StatsService
+
+
+def test_docs_signature_sees_pdfs_rewritten_in_place(tmp_path, stats_service_class):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    pdf = docs / "guide.pdf"
+    pdf.write_bytes(b"%PDF-1.4 first")
+    service = stats_service_class(str(docs), str(tmp_path / "videos.json"), str(tmp_path / "kb"))
+    before = service._docs_signature()
+    directory_times = (os.stat(docs).st_atime_ns, os.stat(docs).st_mtime_ns)
+
+    pdf.write_bytes(b"%PDF-1.4 second version")
+    os.utime(docs, ns=directory_times)
+
+    assert service._docs_signature() != before
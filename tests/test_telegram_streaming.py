@@ -0,0 +1,40 @@
+import asyncio
+
+from telegram.error import BadRequest
+
+from utils.telegram_streaming import TELEGRAM_MAX_LENGTH, send_reply
+
+
+class FakeMessage:
+    message_id = 42
+
+    def __init__(self, reject_markdown=False):
+        self.reject_markdown = reject_markdown
+        self.sent = []
+
+    async def reply_text(self, text, parse_mode=None, **kwargs):
+        if parse_mode and self.reject_markdown:
+            raise BadRequest("Can't parse entities")
+        self.sent.append((text, parse_mode, kwargs.get('reply_to_message_id')))
+
+
+def test_send_reply_splits_long_answers():
+    message = FakeMessage()
+    text = "\n".join(["line of the answer"] * 500)
+
+    asyncio.run(send_reply(message, text))
+
+    assert len(message.sent) > 1
+    assert all(len(part) <= TELEGRAM_MAX_LENGTH for part, _, _ in message.sent)
+    assert message.sent[0][2] == 42
+    assert "\n".join(part for part, _, _ in message.sent) == text
+
+
+def test_send_reply_falls_back_to_plain_text():
+    unbalanced = FakeMessage()
+    asyncio.run(send_reply(unbalanced, "Use the *swap page"))
+    assert unbalanced.sent == [("Use the *swap page", None, 42)]
+
+    rejected = FakeMessage(reject_markdown=True)
+    asyncio.run(send_reply(rejected, "Use the *swap* page"))
+    assert rejected.sent == [("Use the *swap* page", None, 42)]
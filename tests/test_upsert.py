@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("chromadb")
+tiktoken = pytest.importorskip("tiktoken")
+
+from langchain.schema import Document
+
+from conftest import KeywordEmbeddings
+from knowledge.embedding_store import CachedEmbeddings, EmbeddingStore
+
+
+def test_upsert_embeds_each_new_chunk_once(knowledge_base, tmp_path):
+    try:
+        tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        pytest.skip(f"Tokenizer data unavailable: {e.__class__.__name__}")
+    kb, _ = knowledge_base
+    kb.embeddings = CachedEmbeddings(KeywordEmbeddings(), model="test",
+                                     store=EmbeddingStore(str(tmp_path / "vectors.sqlite3")))
+    kb._use_directory(kb.persist_directory, *kb._open_directory(kb.persist_directory))
+    docs = [
+        Document(page_content="Connect a wallet before you swap", metadata={"source": "wallet.pdf", "page": 0}),
+        Document(page_content="Wallet settings for NFT drops", metadata={"source": "wallet.pdf", "page": 1}),
+    ]
+
+    kb.upsert_documents(docs)
+
+    assert kb.embeddings.stats() == {'reused': 0, 'computed': 2}
+    stored = kb.db._collection.get(where={"source": "wallet.pdf"}, include=['embeddings', 'metadatas'])
+    assert len(stored['ids']) == 2
+    assert sorted(stored['ids']) == sorted(kb._document_id(doc) for doc in docs)
+    assert all(metadata['source'] == "wallet.pdf" for metadata in stored['metadatas'])
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict
+
+_STREAM_END = object()
+
+
+class CompletionPool:
+    def __init__(self, max_concurrent: int = 8):
+        """
+        Bounded pool for running blocking LLM calls off the event loop
+        :param max_concurrent: Maximum number of completions in flight
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent,
+            thread_name_prefix="completion"
+        )
+        self._semaphore = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_waiting = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Creates the semaphore lazily so it binds to the running loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Runs a blocking function in the pool, waiting for a free slot
+        :param func: Blocking callable (e.g. Swarm.run)
+        :return: Whatever the callable returns
+        """
+        semaphore = self._get_semaphore()
+        queued_at = time.monotonic()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.monotonic()
+        self._total_wait += started_at - queued_at
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._total_run += time.monotonic() - started_at
+            semaphore.release()
+
+    async def stream(self, func: Callable, *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Runs a blocking generator function in the pool and yields its items
+        :param func: Callable returning a generator (e.g. Swarm.run with stream=True)
+        :return: Async iterator over the generator items
+        """
+        semaphore = self._get_semaphore()
+        queued_at = time.monotonic()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.monotonic()
+        self._total_wait += started_at - queued_at
+        self.in_flight += 1
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+
+        def produce():
+            try:
+                for item in func(*args, **kwargs):
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+                loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        producer = loop.run_in_executor(self._executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            self.completed += 1
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            stopped.set()
+            self.in_flight -= 1
+            self._total_run += time.monotonic() - started_at
+            producer.add_done_callback(lambda _: semaphore.release())
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns queue depth and timing information"""
+        finished = self.completed + self.failed
+        return {
+            'max_concurrent': self.max_concurrent,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'max_waiting': self.max_waiting,
+            'completed': self.completed,
+            'failed': self.failed,
+            'avg_wait_seconds': self._total_wait / finished if finished else 0.0,
+            'avg_run_seconds': self._total_run / finished if finished else 0.0
+        }
+
+    def shutdown(self):
+        """Stops accepting work and releases the worker threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+
+class ConversationStore:
+    def __init__(self, history_size: int = 20, idle_ttl: int = 86400,
+                 max_bytes: int = 50 * 1024 * 1024, db_path: Optional[str] = None):
+        """
+        Bounded per-chat message history
+        :param history_size: Messages kept per chat (ring buffer); 0 disables history
+        :param idle_ttl: Seconds of inactivity before a chat is evicted from memory
+        :param max_bytes: Global cap on the size of message contents held in memory
+        :param db_path: Optional SQLite file used to persist history across restarts
+        """
+        self.history_size = max(0, history_size)
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._chats: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._conn = None
+
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_chat ON messages (chat_id, id)")
+            self._conn.commit()
+
+    @staticmethod
+    def _size(message: Dict[str, str]) -> int:
+        return len(message['content'].encode('utf-8'))
+
+    def _load(self, chat_id: int) -> Dict[str, Any]:
+        """Returns the in-memory chat, loading its tail from SQLite if needed"""
+        chat = self._chats.get(chat_id)
+        if chat is not None:
+            self._chats.move_to_end(chat_id)
+            return chat
+
+        messages = deque(maxlen=self.history_size)
+        if self._conn:
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE chat_id = ? ORDER BY id DESC LIMIT ?",
+                (chat_id, self.history_size)
+            ).fetchall()
+            for role, content in reversed(rows):
+                messages.append({'role': role, 'content': content})
+
+        chat = {'messages': messages, 'bytes': sum(self._size(m) for m in messages), 'last_active': time.time()}
+        self._chats[chat_id] = chat
+        self._bytes += chat['bytes']
+        return chat
+
+    def append(self, chat_id: int, role: str, content: str):
+        """Adds a message to a chat, dropping the oldest one when the ring is full"""
+        if not self.history_size:
+            return
+        message = {'role': role, 'content': content}
+        with self._lock:
+            chat = self._load(chat_id)
+            if len(chat['messages']) == chat['messages'].maxlen:
+                dropped = chat['messages'][0]
+                chat['bytes'] -= self._size(dropped)
+                self._bytes -= self._size(dropped)
+            chat['messages'].append(message)
+            chat['bytes'] += self._size(message)
+            self._bytes += self._size(message)
+            chat['last_active'] = time.time()
+
+            if self._conn:
+                self._conn.execute(
+                    "INSERT INTO messages (chat_id, role, content) VALUES (?, ?, ?)",
+                    (chat_id, role, content)
+                )
+                self._conn.execute(
+                    """DELETE FROM messages WHERE chat_id = ? AND id <= (
+                        SELECT id FROM messages WHERE chat_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?
+                    )""",
+                    (chat_id, chat_id, self.history_size)
+                )
+                self._conn.commit()
+
+            self._evict(keep=chat_id)
+
+    def recent(self, chat_id: int, limit: int) -> List[Dict[str, str]]:
+        """Returns up to `limit` of the chat's most recent messages, oldest first"""
+        with self._lock:
+            messages = list(self._load(chat_id)['messages'])
+        return messages[-limit:] if limit else []
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    def _evict(self, keep: int):
+        """Evicts idle chats, then the least recently active ones while over the memory cap"""
+        now = time.time()
+        while self._chats:
+            chat_id, chat = next(iter(self._chats.items()))
+            if chat_id == keep:
+                break
+            idle = now - chat['last_active'] > self.idle_ttl
+            if not idle and self._bytes <= self.max_bytes:
+                break
+            del self._chats[chat_id]
+            self._bytes -= chat['bytes']
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns memory usage of the store"""
+        return {
+            'chats': len(self._chats),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'persistent': self._conn is not None
+        }
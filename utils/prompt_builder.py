@@ -0,0 +1,107 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import tiktoken
+
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+
+class PromptBuilder:
+    def __init__(self, model: str, budget_tokens: int = 6000, min_piece_tokens: int = 50):
+        """
+        Assembles chat prompts within a token budget
+        :param model: Model name used to pick the tokenizer
+        :param budget_tokens: Maximum prompt size in tokens
+        :param min_piece_tokens: Smallest truncated piece worth keeping
+        """
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.budget_tokens = budget_tokens
+        self.min_piece_tokens = min_piece_tokens
+        self._count = lru_cache(maxsize=1024)(self._count_uncached)
+
+    def _count_uncached(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def count(self, text: str) -> int:
+        """Number of tokens in a text"""
+        return self._count(text)
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """Number of tokens a list of chat messages uses, including per-message overhead"""
+        return REPLY_PRIMING_TOKENS + sum(
+            MESSAGE_OVERHEAD_TOKENS + self.count(message['content']) for message in messages
+        )
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cuts a text down to at most max_tokens tokens"""
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens])
+
+    def build(self, instructions: str, context_chunks: List[str], history: List[Dict[str, str]],
+              question: str, reminder: str = "") -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+        """
+        Builds the message list, filling the budget in priority order:
+        instructions, best-ranked context chunks, then the most recent turns
+        :param instructions: Agent instructions; the agent runner sends them as the first system
+                             message, so they are only reserved from the budget, not included
+        :param context_chunks: Retrieved context, best match first
+        :param history: Previous messages, oldest first
+        :param question: Current user question, always included
+        :param reminder: Optional extra system message, always included
+        :return: (messages, stats) where stats holds token counts
+        """
+        fixed = [{"role": "user", "content": question}]
+        if reminder:
+            fixed.append({"role": "system", "content": reminder})
+        instruction_tokens = MESSAGE_OVERHEAD_TOKENS + self.count(instructions)
+        remaining = self.budget_tokens - self.count_messages(fixed) - instruction_tokens
+
+        if context_chunks:
+            # Context travels in its own system message
+            remaining -= MESSAGE_OVERHEAD_TOKENS
+
+        kept_context = []
+        separator_tokens = self.count("\n")
+        for chunk in context_chunks:
+            cost = self.count(chunk) + separator_tokens
+            if cost <= remaining:
+                kept_context.append(chunk)
+                remaining -= cost
+                continue
+            if remaining - separator_tokens >= self.min_piece_tokens:
+                kept_context.append(self.truncate(chunk, remaining - separator_tokens))
+                remaining = 0
+            break
+
+        kept_history = []
+        for message in reversed(history):
+            cost = MESSAGE_OVERHEAD_TOKENS + self.count(message['content'])
+            if cost > remaining:
+                break
+            kept_history.append(message)
+            remaining -= cost
+        kept_history.reverse()
+
+        messages = []
+        if kept_context:
+            messages.append({"role": "system", "content": "\n".join(kept_context)})
+        if reminder:
+            messages.append({"role": "system", "content": reminder})
+        messages.extend(kept_history)
+        messages.append({"role": "user", "content": question})
+
+        stats = {
+            'tokens': self.count_messages(messages) + instruction_tokens,
+            'budget': self.budget_tokens,
+            'context_chunks': len(kept_context),
+            'context_dropped': len(context_chunks) - len(kept_context),
+            'history_messages': len(kept_history),
+            'history_dropped': len(history) - len(kept_history)
+        }
+        return messages, stats
@@ -0,0 +1,137 @@
+import asyncio
+import re
+import time
+from typing import List, Optional
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+
+TELEGRAM_MAX_LENGTH = 4096
+
+
+def is_valid_markdown(text: str) -> bool:
+    """Check that legacy Markdown entities in the text are balanced"""
+    stripped = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
+    if '```' in stripped:
+        return False
+    stripped = re.sub(r'`[^`]*`', '', stripped)
+    if '`' in stripped:
+        return False
+    stripped = re.sub(r'\[[^\]]*\]\([^)]*\)', '', stripped)
+    for marker in ('*', '_'):
+        if stripped.count(marker) % 2:
+            return False
+    return stripped.count('[') == stripped.count(']')
+
+
+def split_message(text: str, limit: int = TELEGRAM_MAX_LENGTH) -> List[str]:
+    """Split text into Telegram-sized parts, preferring paragraph boundaries"""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    parts.append(text)
+    return parts
+
+
+async def send_text(message: Message, text: str, **kwargs):
+    """Replies with text as Markdown when it parses cleanly, plain text otherwise"""
+    if is_valid_markdown(text):
+        try:
+            return await message.reply_text(text, parse_mode='Markdown', **kwargs)
+        except BadRequest:
+            pass
+    return await message.reply_text(text, **kwargs)
+
+
+async def send_reply(message: Message, text: str):
+    """Answers a message with text of any length, split into Telegram-sized parts"""
+    parts = split_message(text)
+    await send_text(message, parts[0], reply_to_message_id=message.message_id)
+    for part in parts[1:]:
+        await send_text(message, part)
+
+
+class StreamingReply:
+    def __init__(self, message: Message, min_edit_interval: float = 1.0,
+                 placeholder: str = "..."):
+        """
+        Progressively edited reply to a Telegram message
+        :param message: Message being answered
+        :param min_edit_interval: Minimum seconds between edits of the reply
+        :param placeholder: Text sent before the first token arrives
+        """
+        self.message = message
+        self.min_edit_interval = min_edit_interval
+        self.placeholder = placeholder
+        self.text = ""
+        self.reply: Optional[Message] = None
+        self.edits = 0
+        self._shown = ""
+        self._last_edit = 0.0
+
+    @property
+    def started(self) -> bool:
+        return self.reply is not None
+
+    async def start(self):
+        """Sends the placeholder reply"""
+        self.reply = await self.message.reply_text(
+            self.placeholder,
+            reply_to_message_id=self.message.message_id
+        )
+        self._last_edit = time.monotonic()
+
+    async def push(self, delta: str):
+        """Appends streamed text, editing the reply at most once per interval"""
+        if not self.started:
+            await self.start()
+        self.text += delta
+        if time.monotonic() - self._last_edit >= self.min_edit_interval:
+            await self._edit(self.text[:TELEGRAM_MAX_LENGTH])
+
+    async def finish(self, final_text: Optional[str] = None):
+        """Sends the final text, formatted as Markdown when it parses cleanly"""
+        if final_text:
+            self.text = final_text
+        if not self.started:
+            await self.start()
+
+        parts = split_message(self.text or self.placeholder)
+        await self._edit(parts[0], final=True)
+        for part in parts[1:]:
+            await self._send(part)
+
+    async def _edit(self, text: str, final: bool = False):
+        if not final and text == self._shown:
+            return
+        self._last_edit = time.monotonic()
+        try:
+            if final and is_valid_markdown(text):
+                try:
+                    await self.reply.edit_text(text, parse_mode='Markdown')
+                    self._shown = text
+                    self.edits += 1
+                    return
+                except BadRequest as e:
+                    if 'not modified' in str(e).lower():
+                        return
+            if text != self._shown:
+                await self.reply.edit_text(text)
+                self._shown = text
+                self.edits += 1
+        except RetryAfter as e:
+            # Telegram asked us to slow down; skip intermediate edits until then
+            self._last_edit = time.monotonic() + e.retry_after
+            if final:
+                await asyncio.sleep(e.retry_after)
+                await self._edit(text, final=True)
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                raise
+
+    async def _send(self, text: str):
+        await send_text(self.message, text)